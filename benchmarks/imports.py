@@ -0,0 +1,103 @@
+"""
+Benchmarks how long it takes to import chalice-spec's entry points, and
+whether they load the schema-generation dependencies.
+
+    python -m benchmarks.imports
+
+Every import runs in a fresh interpreter with `python -X importtime`, so
+numbers reflect a cold start.
+"""
+
+import argparse
+import json
+import statistics
+import subprocess
+import sys
+from typing import Dict, List
+
+MODULES = ["chalice_spec", "chalice_spec.blueprint", "chalice_spec.runtime"]
+
+# Dependencies that serving a prebuilt spec should not need.
+HEAVY = ["apispec", "pydantic"]
+
+
+def import_time(module: str) -> Dict[str, int]:
+    """
+    Imports a module in a fresh interpreter, and returns the microseconds
+    spent importing each module it loaded, including itself and its
+    dependencies.
+    """
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+
+    cumulative = {}
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "|" not in line:
+            continue
+        _, cumulative_us, name = (part.strip() for part in line.split("|"))
+        try:
+            cumulative[name] = int(cumulative_us)
+        except ValueError:  # The header line.
+            continue
+    return cumulative
+
+
+def measure(module: str, repeat: int = 5) -> Dict[str, object]:
+    """
+    The median time to import a module, how many modules it loads, and
+    which of the HEAVY dependencies it loads.
+    """
+    runs = [import_time(module) for _ in range(repeat)]
+    loaded = runs[-1]
+    return {
+        "module": module,
+        "import_ms": statistics.median(run[module] for run in runs) / 1000,
+        "modules": len(loaded),
+        "heavy": [
+            dependency
+            for dependency in HEAVY
+            if any(name.split(".")[0] == dependency for name in loaded)
+        ],
+    }
+
+
+def format_table(results: List[Dict[str, object]]) -> str:
+    rows = [["module", "import_ms", "modules", "heavy"]]
+    for result in results:
+        rows.append(
+            [
+                result["module"],
+                f"{result['import_ms']:.2f}",
+                str(result["modules"]),
+                ", ".join(result["heavy"]) or "-",
+            ]
+        )
+    widths = [max(len(row[i]) for row in rows) for i in range(len(rows[0]))]
+    return "\n".join(
+        "  ".join(cell.ljust(width) for cell, width in zip(row, widths)).rstrip()
+        for row in rows
+    )
+
+
+def main(argv: List[str] = None) -> int:
+    parser = argparse.ArgumentParser(prog="python -m benchmarks.imports")
+    parser.add_argument("--modules", nargs="+", default=MODULES)
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--json", action="store_true", help="Print results as JSON.")
+    args = parser.parse_args(argv)
+
+    results = [measure(module, args.repeat) for module in args.modules]
+
+    if args.json:
+        print(json.dumps(results, indent=2))
+    else:
+        print(format_table(results))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
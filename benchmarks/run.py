@@ -0,0 +1,179 @@
+"""
+Benchmarks spec generation for synthetic apps of increasing size.
+
+    python -m benchmarks.run --routes 10 100 1000 10000
+
+Every measurement imports a freshly generated app in a clean schema cache,
+so numbers are comparable between runs and between commits.
+"""
+
+import argparse
+import importlib
+import json
+import statistics
+import sys
+import tempfile
+import time
+import tracemalloc
+from typing import Dict, List
+
+from chalice.test import Client
+
+from benchmarks.synthetic import write_app
+from chalice_spec.blueprint import serialize_spec
+from chalice_spec.pydantic import schema_cache
+
+
+def measure(
+    routes: int,
+    models: int,
+    depth: int,
+    blueprints: int,
+    lazy: bool = False,
+    requests: int = 20,
+    trace_memory: bool = True,
+) -> Dict[str, float]:
+    """
+    Generates an app of the given shape and returns how long it took to
+    import and document, to convert and serialize the spec, the serialized
+    size, the peak memory allocated while importing, and /openapi.json
+    latencies.
+    """
+    schema_cache.clear()
+    name = f"synthetic_{routes}_{models}_{depth}_{blueprints}_{int(lazy)}"
+
+    with tempfile.TemporaryDirectory() as directory:
+        models_module, app_module = write_app(
+            directory, name, routes, models, depth, blueprints, lazy
+        )
+        sys.path.insert(0, directory)
+        try:
+            # Defining the models is the app's own cost, not chalice-spec's.
+            importlib.import_module(models_module)
+
+            # Measure memory on a separate import, as tracing slows it down.
+            import_peak = 0
+            if trace_memory:
+                tracemalloc.start()
+                importlib.import_module(app_module)
+                _, import_peak = tracemalloc.get_traced_memory()
+                tracemalloc.stop()
+                sys.modules.pop(app_module)
+                schema_cache.clear()
+
+            start = time.perf_counter()
+            module = importlib.import_module(app_module)
+            import_seconds = time.perf_counter() - start
+
+            app = module.app
+            start = time.perf_counter()
+            spec = app.build_spec()
+            build_seconds = time.perf_counter() - start
+
+            start = time.perf_counter()
+            spec.to_dict()
+            to_dict_seconds = time.perf_counter() - start
+
+            start = time.perf_counter()
+            document = serialize_spec(spec)
+            serialize_seconds = time.perf_counter() - start
+
+            latencies = []
+            with Client(app) as client:
+                for _ in range(requests + 1):
+                    start = time.perf_counter()
+                    client.http.get("/openapi.json")
+                    latencies.append(time.perf_counter() - start)
+        finally:
+            sys.path.remove(directory)
+            sys.modules.pop(models_module, None)
+            sys.modules.pop(app_module, None)
+
+    return {
+        "routes": routes,
+        "models": models,
+        "depth": depth,
+        "blueprints": blueprints,
+        "lazy": lazy,
+        "import_ms": import_seconds * 1000,
+        "build_ms": build_seconds * 1000,
+        "to_dict_ms": to_dict_seconds * 1000,
+        "serialize_ms": serialize_seconds * 1000,
+        "spec_bytes": len(document.encode("utf-8")),
+        "import_peak_kib": import_peak / 1024,
+        "first_request_ms": latencies[0] * 1000,
+        "request_median_ms": statistics.median(latencies[1:]) * 1000,
+    }
+
+
+COLUMNS = [
+    "routes",
+    "lazy",
+    "import_ms",
+    "build_ms",
+    "to_dict_ms",
+    "serialize_ms",
+    "spec_bytes",
+    "import_peak_kib",
+    "first_request_ms",
+    "request_median_ms",
+]
+
+
+def format_table(results: List[Dict[str, float]]) -> str:
+    rows = [COLUMNS]
+    for result in results:
+        rows.append(
+            [
+                (
+                    f"{result[column]:.2f}"
+                    if isinstance(result[column], float)
+                    else str(result[column])
+                )
+                for column in COLUMNS
+            ]
+        )
+    widths = [max(len(row[i]) for row in rows) for i in range(len(COLUMNS))]
+    return "\n".join(
+        "  ".join(cell.rjust(width) for cell, width in zip(row, widths)) for row in rows
+    )
+
+
+def main(argv: List[str] = None) -> int:
+    parser = argparse.ArgumentParser(prog="python -m benchmarks.run")
+    parser.add_argument("--routes", type=int, nargs="+", default=[10, 100, 1000])
+    parser.add_argument("--models", type=int, default=50)
+    parser.add_argument("--depth", type=int, default=2)
+    parser.add_argument("--blueprints", type=int, default=4)
+    parser.add_argument("--lazy", action="store_true", help="Use lazy_spec=True.")
+    parser.add_argument("--requests", type=int, default=20)
+    parser.add_argument(
+        "--no-memory",
+        action="store_true",
+        help="Skip measuring peak memory, which is slow for large apps.",
+    )
+    parser.add_argument("--json", action="store_true", help="Print results as JSON.")
+    args = parser.parse_args(argv)
+
+    results = [
+        measure(
+            routes,
+            min(args.models, routes),
+            args.depth,
+            args.blueprints,
+            args.lazy,
+            args.requests,
+            not args.no_memory,
+        )
+        for routes in args.routes
+    ]
+
+    if args.json:
+        print(json.dumps(results, indent=2))
+    else:
+        print(format_table(results))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,108 @@
+"""
+Generates synthetic Chalice apps for benchmarking chalice-spec.
+
+Apps are written out as real modules and imported, so that the benchmarks
+measure the same import-time work a Lambda does on a cold start.
+"""
+
+import os
+from typing import List
+
+
+def models_source(models: int, depth: int) -> str:
+    """
+    Source for a module of `models` Pydantic models, each nesting a chain of
+    `depth` further models.
+    """
+    lines = ["from typing import List, Optional", "", "from pydantic import BaseModel"]
+    for model in range(models):
+        for level in range(depth, -1, -1):
+            name = f"Model{model}" if level == 0 else f"Model{model}Level{level}"
+            lines += ["", "", f"class {name}(BaseModel):"]
+            lines += ["    name: str", "    count: int", "    tags: List[str] = []"]
+            if level < depth:
+                lines += [f"    child: Optional[Model{model}Level{level + 1}] = None"]
+    return "\n".join(lines) + "\n"
+
+
+def app_source(
+    models_module: str, routes: int, models: int, blueprints: int, lazy: bool
+) -> str:
+    """
+    Source for a module defining `app`, a ChaliceWithSpec with `routes` routes
+    (each with a GET and a POST operation) spread over `blueprints` blueprints,
+    plus the docs blueprint.
+    """
+    lines = [
+        "from apispec import APISpec",
+        "",
+        "from chalice_spec import BlueprintWithSpec, ChaliceWithSpec, Docs, Op",
+        "from chalice_spec import PydanticPlugin",
+        "from chalice_spec.blueprint import chalice_spec_blueprint",
+        f"from {models_module} import *",
+        "",
+        "spec = APISpec(",
+        '    title="Benchmark",',
+        '    openapi_version="3.0.1",',
+        '    version="0.0.0",',
+        "    plugins=[PydanticPlugin()],",
+        ")",
+        f'app = ChaliceWithSpec(app_name="benchmark", spec=spec, lazy_spec={lazy})',
+        "app.register_blueprint(chalice_spec_blueprint(app))",
+    ]
+    for blueprint in range(blueprints):
+        lines += [
+            f'blueprint{blueprint} = BlueprintWithSpec(__name__, tags=["b{blueprint}"])'
+        ]
+
+    for route in range(routes):
+        target = f"blueprint{route % blueprints}" if blueprints else "app"
+        request = f"Model{route % models}"
+        response = f"Model{(route + 1) % models}"
+        lines += [
+            "",
+            "",
+            f"@{target}.route(",
+            f'    "/resource{route}/{{id}}",',
+            '    methods=["GET", "POST"],',
+            "    docs=Docs(",
+            f"        get={response},",
+            f"        post=Op(request={request}, response={response}),",
+            "    ),",
+            ")",
+            f"def route{route}(id):",
+            f'    """Route {route}.',
+            "",
+            f'    Reads or replaces resource {route}."""',
+            "    return {}",
+        ]
+
+    for blueprint in range(blueprints):
+        lines += [
+            "",
+            "",
+            f'app.register_blueprint(blueprint{blueprint}, url_prefix="/b{blueprint}")',
+        ]
+
+    return "\n".join(lines) + "\n"
+
+
+def write_app(
+    directory: str,
+    name: str,
+    routes: int,
+    models: int,
+    depth: int,
+    blueprints: int,
+    lazy: bool = False,
+) -> List[str]:
+    """
+    Writes a synthetic app to `directory` as the modules `{name}_models` and
+    `{name}_app`, and returns their names.
+    """
+    models_module, app_module = f"{name}_models", f"{name}_app"
+    with open(os.path.join(directory, models_module + ".py"), "w") as f:
+        f.write(models_source(models, depth))
+    with open(os.path.join(directory, app_module + ".py"), "w") as f:
+        f.write(app_source(models_module, routes, models, blueprints, lazy))
+    return [models_module, app_module]
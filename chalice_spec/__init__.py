@@ -1,4 +1,71 @@
-from .chalice_legacy import *
-from .chalice import *
-from .docs import *
-from .pydantic import *
+"""
+chalice-spec: Chalice x APISpec x Pydantic plug-ins.
+
+Submodules are imported when one of their names is first used, so that
+`from chalice_spec import Docs` does not load apispec, Chalice or Pydantic,
+and chalice_spec.runtime can serve a prebuilt spec without them.
+"""
+
+import importlib
+
+# Public names, and the submodule that defines each.
+_NAMES = {
+    "ChalicePlugin": "chalice_legacy",
+    "BlueprintWithSpec": "chalice",
+    "ChaliceWithSpec": "chalice",
+    "default_docs_for_methods": "chalice",
+    "DEFAULT_CODE": "docs",
+    "DEFAULT_CONTENT_TYPE": "docs",
+    "DEFAULT_DESCRIPTION": "docs",
+    "Docs": "docs",
+    "Method": "docs",
+    "Op": "docs",
+    "Operation": "docs",
+    "Resp": "docs",
+    "Response": "docs",
+    "trim_docstring": "docs",
+    "SpecFragment": "fragments",
+    "CacheInfo": "pydantic",
+    "DISK_CACHE_VERSION": "pydantic",
+    "PYDANTIC_V2": "pydantic",
+    "PydanticPlugin": "pydantic",
+    "REF_TEMPLATE": "pydantic",
+    "SchemaCache": "pydantic",
+    "model_fingerprint": "pydantic",
+    "model_validator": "pydantic",
+    "schema_cache": "pydantic",
+    "type_adapter": "pydantic",
+    "SpecStats": "stats",
+    "ResponseCheck": "validation",
+    "sample_response_validation": "validation",
+    "validate_request_body": "validation",
+}
+
+_SUBMODULES = {
+    "blueprint",
+    "chalice",
+    "chalice_legacy",
+    "docs",
+    "fragments",
+    "pydantic",
+    "runtime",
+    "stats",
+    "validation",
+}
+
+__all__ = list(_NAMES)
+
+
+def __getattr__(name):
+    if name in _SUBMODULES:
+        return importlib.import_module(f"{__name__}.{name}")
+    if name not in _NAMES:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+    value = getattr(importlib.import_module(f"{__name__}.{_NAMES[name]}"), name)
+    globals()[name] = value
+    return value
+
+
+def __dir__():
+    return sorted(set(globals()) | set(_NAMES) | _SUBMODULES)
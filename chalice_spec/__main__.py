@@ -0,0 +1,256 @@
+"""
+Command line tools for chalice-spec.
+
+    python -m chalice_spec export app:app --out openapi.json
+    python -m chalice_spec profile app:app
+    python -m chalice_spec components app:app
+"""
+
+import argparse
+import importlib
+import json
+import os
+import sys
+import time
+from typing import List, Optional
+
+from chalice_spec.chalice import ChaliceWithSpec
+from chalice_spec.documents import (
+    PROFILES,
+    deduplicate,
+    duplicate_components,
+    fan_in,
+    hoist_components,
+    minify,
+    serialize_document,
+    tree_shake,
+    unused_components,
+)
+
+
+class TargetError(Exception):
+    """
+    The app given on the command line could not be found.
+    """
+
+
+def load_app(target: str) -> ChaliceWithSpec:
+    """
+    Imports a ChaliceWithSpec app given as "module:attribute", e.g. "app:app".
+    The current directory is importable, as it would be for `chalice local`.
+
+    Raises TargetError if there is no such app. Errors raised while the
+    app's module is imported are left alone, so that they can be debugged.
+    """
+    module_name, _, attribute = target.partition(":")
+    if not module_name or not attribute:
+        raise TargetError(f"Expected an app in the form module:attribute, not {target}")
+
+    if os.getcwd() not in sys.path:
+        sys.path.insert(0, os.getcwd())
+
+    try:
+        app = importlib.import_module(module_name)
+    except ModuleNotFoundError as e:
+        # Only the app's own module; a module it imports may be missing too.
+        if e.name != module_name and not module_name.startswith(f"{e.name}."):
+            raise
+        raise TargetError(f"No module named {module_name}") from e
+    for name in attribute.split("."):
+        if not hasattr(app, name):
+            raise TargetError(f"{target} does not exist")
+        app = getattr(app, name)
+
+    if not isinstance(app, ChaliceWithSpec):
+        raise TargetError(f"{target} is not a ChaliceWithSpec app")
+
+    return app
+
+
+def app_document(app: ChaliceWithSpec) -> dict:
+    """
+    The spec of an app as it is served. Apps that froze their spec at import
+    can no longer build it, so their frozen spec is used instead.
+    """
+    if app.frozen_spec is not None:
+        return json.loads(app.frozen_spec)
+    return app.spec_document()
+
+
+def export(
+    target: str,
+    out: Optional[str],
+    indent: Optional[int],
+    prune: bool = False,
+    dedupe: bool = False,
+    hoist: bool = False,
+    profile: str = "full",
+) -> None:
+    document = app_document(load_app(target))
+    if dedupe:
+        document = deduplicate(document)
+    if hoist:
+        document = hoist_components(document)
+    if prune:
+        document = tree_shake(document)
+    if PROFILES[profile] is not None:
+        document = minify(document, PROFILES[profile])
+    document = serialize_document(document, indent=indent)
+
+    if out:
+        with open(out, "w", encoding="utf-8") as out_file:
+            out_file.write(document)
+    else:
+        sys.stdout.write(document + "\n")
+
+
+def profile(target: str, top: int, as_json: bool) -> None:
+    start = time.perf_counter()
+    app = load_app(target)
+    import_seconds = time.perf_counter() - start
+
+    # A frozen spec was built during the import, and its stats recorded then.
+    frozen = app.frozen_spec is not None
+    start = time.perf_counter()
+    if not frozen:
+        app.build_spec()
+    build_seconds = time.perf_counter() - start
+
+    if as_json:
+        stats = dict(
+            app.spec_stats.to_dict(),
+            import_seconds=import_seconds,
+            build_spec_seconds=build_seconds,
+            frozen=frozen,
+        )
+        sys.stdout.write(json.dumps(stats, indent=2) + "\n")
+    else:
+        built = (
+            "spec frozen during import"
+            if frozen
+            else f"build_spec: {build_seconds * 1000:.2f} ms"
+        )
+        sys.stdout.write(
+            f"Import: {import_seconds * 1000:.2f} ms ({built})\n"
+            + app.spec_stats.report(top)
+            + "\n"
+        )
+
+
+def components(target: str, as_json: bool) -> None:
+    app = load_app(target)
+    if app.frozen_spec is not None:
+        document = json.loads(app.frozen_spec)
+    else:
+        document = app.build_spec().to_dict()
+    counts = fan_in(document)
+    unused = unused_components(document)
+    duplicates = duplicate_components(document)
+    size = len(serialize_document(document))
+    saved = size - len(serialize_document(tree_shake(document)))
+    deduplicated = size - len(serialize_document(deduplicate(document)))
+
+    if as_json:
+        report = {
+            "fan_in": counts,
+            "unused": unused,
+            "unused_bytes": saved,
+            "duplicates": duplicates,
+            "duplicate_bytes": deduplicated,
+        }
+        sys.stdout.write(json.dumps(report, indent=2) + "\n")
+        return
+
+    lines = [
+        f"Components: {len(counts)}, unused: {len(unused)} "
+        f"({saved} bytes of the serialized spec)",
+        f"Duplicates: {len(duplicates)} ({deduplicated} bytes)",
+    ]
+    for alias, ref in duplicates.items():
+        lines.append(f"  {alias} = {ref}")
+    lines.append("Fan-in:")
+    for ref, count in sorted(counts.items(), key=lambda item: (-item[1], item[0])):
+        lines.append(f"  {count:6}  {ref}" + ("  (unused)" if ref in unused else ""))
+    sys.stdout.write("\n".join(lines) + "\n")
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(prog="python -m chalice_spec")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    export_parser = commands.add_parser(
+        "export", help="Build the spec for an app and write it as JSON."
+    )
+    export_parser.add_argument("app", help="The app to export, e.g. app:app")
+    export_parser.add_argument(
+        "--out", help="Where to write the spec. Defaults to standard output."
+    )
+    export_parser.add_argument(
+        "--indent", type=int, help="Indent the JSON, rather than writing it compactly."
+    )
+    export_parser.add_argument(
+        "--prune", action="store_true", help="Leave out unused components."
+    )
+    export_parser.add_argument(
+        "--dedupe",
+        action="store_true",
+        help="Replace structurally identical components with aliases.",
+    )
+    export_parser.add_argument(
+        "--hoist",
+        action="store_true",
+        help="Move repeated parameters and responses into the components.",
+    )
+    export_parser.add_argument(
+        "--profile",
+        choices=list(PROFILES),
+        default="full",
+        help="Leave out empty values (compact), and documentation (minified).",
+    )
+
+    profile_parser = commands.add_parser(
+        "profile",
+        help="Import an app, build its spec and report where the time went.",
+    )
+    profile_parser.add_argument("app", help="The app to profile, e.g. app:app")
+    profile_parser.add_argument(
+        "--top", type=int, default=10, help="How many routes and models to list."
+    )
+    profile_parser.add_argument(
+        "--json", action="store_true", help="Print the statistics as JSON."
+    )
+
+    components_parser = commands.add_parser(
+        "components",
+        help="Report how often each component is referenced, and which are unused.",
+    )
+    components_parser.add_argument("app", help="The app to analyse, e.g. app:app")
+    components_parser.add_argument(
+        "--json", action="store_true", help="Print the report as JSON."
+    )
+
+    args = parser.parse_args(argv)
+
+    try:
+        if args.command == "export":
+            export(
+                args.app,
+                args.out,
+                args.indent,
+                args.prune,
+                args.dedupe,
+                args.hoist,
+                args.profile,
+            )
+        elif args.command == "profile":
+            profile(args.app, args.top, args.json)
+        elif args.command == "components":
+            components(args.app, args.json)
+    except TargetError as e:
+        parser.exit(1, f"error: {e}\n")
+
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,55 +1,204 @@
+from typing import Optional, Tuple, Union
+
 from apispec import APISpec
-from chalice import Blueprint, Response
+from chalice import Blueprint
+
+from chalice_spec.chalice import ChaliceWithSpec, spec_revision
+from chalice_spec.documents import serialize_document
+
+# The serving helpers live in chalice_spec.runtime, and are imported here
+# for code that used them from this module.
+from chalice_spec.runtime import (
+    COMPRESSED_CONTENT_TYPE,
+    COMPRESSORS,
+    DEFAULT_CACHE_CONTROL,
+    DEFAULT_PROFILE,
+    SWAGGER_HTML,
+    SWAGGER_TAGS_HTML,
+    PackagedSpec,
+    ServedSpec,
+    SpecBlueprint,
+    add_spec_routes,
+    can_send_binary,
+    conditional_response,
+    etag_matches,
+    make_etag,
+    negotiate_encoding,
+)
+
+
+def serialize_spec(spec: APISpec, indent: Optional[int] = None) -> str:
+    """
+    Serializes a spec to JSON. Unless an indent is given, this matches the
+    compact separators Chalice uses when it serializes a dict.
+    """
+    return serialize_document(spec.to_dict(), indent)
+
+
+# The revision of a frozen spec, which can no longer change.
+FROZEN_REVISION = (-1, -1)
 
 
-def chalice_spec_blueprint(spec: APISpec, enable_swagger: bool = False):
+class SerializedSpec(ServedSpec):
+    """
+    Holds the JSON serialization of a spec, so that it only needs to be
+    rebuilt when routes or blueprints have been added since it was last
+    serialized.
+
+    You may pass either an APISpec or a ChaliceWithSpec app; the latter will
+    have its spec built on first use. Once the app's spec is frozen (see
+    ChaliceWithSpec.freeze_spec), the app's serialized spec is served, and
+    no copy of it is kept here.
+
+    An APISpec is built first too if blueprint, the blueprint serving it,
+    is registered with the (possibly lazy) ChaliceWithSpec app it belongs
+    to.
+    """
+
+    def __init__(
+        self,
+        spec: Union[APISpec, ChaliceWithSpec],
+        blueprint: Optional[Blueprint] = None,
+    ):
+        super().__init__()
+        self._source = spec
+        self._blueprint = blueprint
+        self._revision: Optional[Tuple[int, ...]] = None
+
+    @property
+    def spec(self) -> APISpec:
+        if isinstance(self._source, ChaliceWithSpec):
+            return self._source.build_spec()
+        app = self._app()
+        if app is not None:
+            return app.build_spec()
+        return self._source
+
+    def _app(self) -> Optional[ChaliceWithSpec]:
+        """
+        The app whose APISpec is served, if the blueprint is registered with
+        it and its spec is not frozen.
+        """
+        if self._blueprint is None:
+            return None
+        try:
+            app = self._blueprint.current_app
+        except RuntimeError:
+            return None
+        if isinstance(app, ChaliceWithSpec) and app.spec is self._source:
+            return app
+        return None
+
+    @property
+    def frozen(self) -> Optional[bytes]:
+        if isinstance(self._source, ChaliceWithSpec):
+            return self._source.frozen_spec
+        return None
+
+    def _refresh(self) -> None:
+        frozen = self.frozen
+        if frozen is not None:
+            if self._revision != FROZEN_REVISION:
+                self._body = None
+                self._etag = make_etag(frozen.decode("utf-8"))
+                self._changed()
+                self._revision = FROZEN_REVISION
+            return
+
+        spec = self.spec
+        revision = spec_revision(spec)
+        if self._body is None or revision != self._revision:
+            self._body = serialize_document(self._document())
+            self._etag = make_etag(self._body)
+            self._changed()
+            self._revision = revision
+
+    def _bytes(self) -> bytes:
+        return self.frozen or super()._bytes()
+
+    def _document(self) -> dict:
+        if self.frozen is not None:
+            return super()._document()
+        if isinstance(self._source, ChaliceWithSpec):
+            return self._source.spec_document()
+        return self.spec.to_dict()
+
+    @property
+    def body(self) -> str:
+        self._refresh()
+        if self._body is None:
+            return self.frozen.decode("utf-8")
+        return self._body
+
+
+def chalice_spec_blueprint(
+    spec: Union[APISpec, ChaliceWithSpec, None] = None,
+    enable_swagger: bool = False,
+    cache_control: Optional[str] = DEFAULT_CACHE_CONTROL,
+    compress: bool = False,
+    spec_file: Optional[str] = None,
+    split_tags: bool = False,
+    profile: str = DEFAULT_PROFILE,
+):
     """
     Returns a Blueprint which will render the OpenAPI spec and (optionally)
     a Swagger UI.
 
     This Blueprint is opinionated on the location of the JSON spec file and
     the Swagger UI, and is modelled after FastAPI.
+
+    If you pass a ChaliceWithSpec app instead of an APISpec, the spec will be
+    built on the first request, which pairs well with lazy_spec=True. So
+    will an app's APISpec, if the blueprint is registered with that app.
+
+    Alternatively, pass spec_file instead of a spec to serve a spec that was
+    exported at build time with `python -m chalice_spec export`.
+
+    Both routes send an ETag and answer a matching If-None-Match with a 304.
+    The Cache-Control header may be changed with cache_control, or omitted by
+    passing None.
+
+    With compress=True, the spec is served gzip (or brotli, if installed)
+    compressed to clients that send a matching Accept-Encoding and accept a
+    binary type (such as */*). Compressed bodies are binary, so they are
+    served as COMPRESSED_CONTENT_TYPE, which the blueprint adds to the app's
+    binary types; other clients get the uncompressed application/json spec.
+
+    /openapi.json also answers queries for part of the spec: for example
+    ?paths=/users&tags=billing serves only the operations under /users that
+    are tagged billing, and ?components=Address those that use the Address
+    schema, each with only the components they need. Values may be repeated
+    or comma-separated; see chalice_spec.documents.SpecIndex.
+
+    With split_tags=True, /openapi/{tag}.json serves a spec with only that
+    tag's operations and the components they use, and /openapi/tags.json
+    lists the tags. The Swagger UI then loads the list of tags, and only the
+    spec of the selected tag, rather than the whole spec. Tags are made URL
+    safe, so the tag /users is served at /openapi/users.json.
+
+    Specs can be served in one of several profiles, picked with ?profile=
+    (see chalice_spec.documents.PROFILES): "full" serves the spec as it is,
+    "compact" leaves out empty values that mean the same as no value, and
+    "minified" also leaves out descriptions, summaries and examples, for
+    machine consumers such as gateways. profile sets the profile served
+    without the parameter; the Swagger UI always loads the full profile.
     """
-    blueprint = Blueprint(__name__)
-
-    @blueprint.route("/openapi.json")
-    def openapi_json():
-        return spec.to_dict()
-
-    if enable_swagger:
-
-        @blueprint.route("/docs")
-        def docs():
-            # Courtesy of Stephan Fitzpatrick (@knowsuchagency)
-            html = """
-                    <!DOCTYPE html>
-                    <html lang="en">
-                    <head>
-                      <meta charset="utf-8" />
-                      <meta name="viewport" content="width=device-width, initial-scale=1" />
-                      <meta
-                        name="description"
-                        content="SwaggerUI"
-                      />
-                      <title>SwaggerUI</title>
-                      <link rel="stylesheet" href="https://unpkg.com/swagger-ui-dist@4.5.0/swagger-ui.css" />
-                    </head>
-                    <body>
-                    <div id="swagger-ui"></div>
-                    <script src="https://unpkg.com/swagger-ui-dist@4.5.0/swagger-ui-bundle.js" crossorigin></script>
-                    <script>
-                      window.onload = () => {
-                        window.ui = SwaggerUIBundle({
-                          url: './openapi.json',
-                          dom_id: '#swagger-ui',
-                        });
-                      };
-                    </script>
-                    </body>
-                    </html>
-                """
-            return Response(
-                body=html, status_code=200, headers={"Content-Type": "text/html"}
-            )
+    if (spec is None) == (spec_file is None):
+        raise TypeError("You must pass exactly one of spec or spec_file")
+
+    blueprint = SpecBlueprint(__name__, [COMPRESSED_CONTENT_TYPE] if compress else [])
+    serialized = (
+        PackagedSpec(spec_file) if spec_file else SerializedSpec(spec, blueprint)
+    )
+
+    add_spec_routes(
+        blueprint,
+        serialized,
+        enable_swagger,
+        cache_control,
+        compress,
+        split_tags,
+        profile,
+    )
 
     return blueprint
@@ -1,10 +1,41 @@
-import re
-
-from chalice_spec.docs import trim_docstring
-from chalice_spec import Docs, Operation
-from typing import Any, Callable, Optional, Union, List
+import contextlib
+import functools
+import itertools
+import json
+import weakref
+
+from chalice_spec.docs import (
+    Docs,
+    Operation,
+    Response,
+    forget_built_operations,
+    register_default_responses,
+)
+from chalice_spec.documents import (
+    SpecIndex,
+    deduplicate,
+    hoist_components,
+    serialize_document,
+    tree_shake,
+)
+from chalice_spec.fragments import (
+    SpecFragment,
+    apply_default_responses,
+    apply_docstring,
+    apply_tags,
+    path_parameters,
+)
+from chalice_spec.pydantic import PydanticPlugin, model_validator
+from chalice_spec.stats import SpecStats
+from chalice_spec.validation import (
+    ResponseCheck,
+    sample_response_validation,
+    validate_request_body,
+)
+from typing import Any, Callable, Dict, Iterator, Optional, Tuple, Union, List
 
 from apispec import APISpec
+from apispec.core import COMPONENT_SUBSECTIONS
 from chalice import Blueprint
 from chalice.app import Chalice
 from pydantic import BaseModel
@@ -34,30 +65,162 @@ def default_docs_for_methods(
     )
 
 
+# The keys APISpec.to_dict() writes into the spec's options. OpenAPI 2 specs
+# have their components at the top level.
+GENERATED_OPTIONS = {
+    "paths",
+    "info",
+    "tags",
+    "openapi",
+    "swagger",
+    "components",
+    *COMPONENT_SUBSECTIONS[2].values(),
+}
+
+
+def spec_revision(spec: APISpec) -> Tuple[int, ...]:
+    """
+    A cheap fingerprint of a spec which changes whenever operations,
+    components, tags or options are added to it, safe to compute on every
+    request. It counts them where apispec keeps them, rather than calling
+    to_dict(), which copies the whole spec on every call after the first.
+
+    This relies on APISpec._paths, APISpec._tags and
+    Components._subsections, which are private to apispec but unchanged
+    throughout apispec 6. Only options added under new keys are noticed, as
+    to_dict() merges the whole document into the options under
+    GENERATED_OPTIONS.
+    """
+    return (
+        sum(len(path) for path in spec._paths.values()),
+        sum(len(section) for section in spec.components._subsections.values()),
+        len(spec._tags),
+        sum(1 for key in spec.options if key not in GENERATED_OPTIONS),
+    )
+
+
+FROZEN_SPEC = "The spec has been frozen with freeze_spec(), and can no longer change."
+RELEASED_BLUEPRINT = (
+    "This blueprint's docs were released when the apps it was registered with "
+    "froze their specs."
+)
+VALIDATION_REQUIRES_SPEC = (
+    "Blueprint routes can only be validated when registered with a "
+    "ChaliceWithSpec app."
+)
+
+
 class BlueprintWithSpec(Blueprint):
     """
     A Chalice Blueprint that has been augmented with chalice-spec to
     enable easy OpenAPI documentation.
+
+    default_responses are added to every operation documented in the
+    blueprint, for the status codes it does not document itself.
+
+    Routes accept validate_request like ChaliceWithSpec.route. Views are
+    wrapped when the blueprint is registered, following the settings of the
+    app it is registered with.
     """
 
-    def __init__(self, import_name: str, tags=None) -> None:
+    def __init__(
+        self,
+        import_name: str,
+        tags=None,
+        default_responses: Optional[List[Response]] = None,
+    ) -> None:
         self._chalice_spec_docs = []
         self._chalice_spec_tags = tags
+        self._chalice_spec_default_responses = list(default_responses or [])
+        self._chalice_spec_fragments = {}
+        # The apps the blueprint is registered with; see freeze_spec.
+        self._chalice_spec_apps = weakref.WeakSet()
         super(BlueprintWithSpec, self).__init__(import_name)
 
+    def spec_fragment(
+        self,
+        spec: APISpec,
+        plugin: PydanticPlugin,
+        generate_default_docs: bool = False,
+        stats: Optional[SpecStats] = None,
+        routes: Optional[int] = None,
+    ) -> SpecFragment:
+        """
+        The compiled documentation of this blueprint's first `routes` routes
+        (all of them by default), for specs like the given one. Fragments
+        are compiled once and reused by every app the blueprint is
+        registered with, whatever its url_prefix.
+        """
+        if self._chalice_spec_docs is None:
+            raise TypeError(RELEASED_BLUEPRINT)
+        if routes is None:
+            routes = len(self._chalice_spec_docs)
+        key = (str(spec.openapi_version), type(plugin), generate_default_docs, routes)
+        if key not in self._chalice_spec_fragments:
+            entries = self._chalice_spec_docs[:routes]
+            if generate_default_docs:
+                entries = [
+                    (
+                        path,
+                        methods,
+                        content_types,
+                        docs or default_docs_for_methods(methods, content_types),
+                        func,
+                    )
+                    for path, methods, content_types, docs, func in entries
+                ]
+            self._chalice_spec_fragments[key] = SpecFragment.compile(
+                entries, key[0], plugin, stats
+            )
+        return self._chalice_spec_fragments[key]
+
     def route(self, path: str, **kwargs: Any) -> Callable[..., Any]:
         def route_decorator(func):
-            docs: Docs = kwargs.pop("docs", None)
+            docs: Docs = kwargs.get("docs", None)
 
             methods = [method.lower() for method in kwargs.get("methods", ["get"])]
             content_types = kwargs.get("content_types", ["application/json"])
 
+            if self._chalice_spec_docs is None:
+                raise TypeError(RELEASED_BLUEPRINT)
             self._chalice_spec_docs.append((path, methods, content_types, docs, func))
 
+            # docs and validate_request are taken out in _register_handler.
             return super(BlueprintWithSpec, self).route(path, **kwargs)(func)
 
         return route_decorator
 
+    def _register_handler(
+        self,
+        handler_type: str,
+        name: str,
+        user_handler: Callable[..., Any],
+        wrapped_handler: Any,
+        kwargs: Dict[str, Any],
+        options: Optional[Dict[Any, Any]] = None,
+    ) -> None:
+        if handler_type != "route":
+            return super(BlueprintWithSpec, self)._register_handler(
+                handler_type, name, user_handler, wrapped_handler, kwargs, options
+            )
+
+        route_kwargs = dict(kwargs["kwargs"])
+        docs = route_kwargs.pop("docs", None)
+        validate_request = route_kwargs.pop("validate_request", None)
+        methods = [method.lower() for method in route_kwargs.get("methods", ["get"])]
+        kwargs = {**kwargs, "kwargs": route_kwargs}
+
+        # Wrap the view for each app it is registered with, as Blueprint does.
+        def register(app: Chalice, options: Dict[Any, Any]) -> None:
+            view = user_handler
+            if isinstance(app, ChaliceWithSpec):
+                view = app._validated_view(view, docs, methods, validate_request, self)
+            elif validate_request:
+                raise TypeError(VALIDATION_REQUIRES_SPEC)
+            app._register_handler(handler_type, name, view, view, kwargs, options)
+
+        self._deferred_registrations.append(register)
+
 
 class ChaliceWithSpec(Chalice):
     """
@@ -87,69 +250,371 @@ class ChaliceWithSpec(Chalice):
     """
 
     def __init__(
-        self, app_name: str, spec: APISpec, generate_default_docs=False, **kwargs
+        self,
+        app_name: str,
+        spec: APISpec,
+        generate_default_docs=False,
+        lazy_spec=False,
+        validate_requests=False,
+        response_validation_rate=0.0,
+        prune_components=False,
+        deduplicate_components=False,
+        hoist_components=False,
+        default_responses: Optional[List[Response]] = None,
+        **kwargs
     ):
         super().__init__(app_name, **kwargs)
 
         self.__spec = spec
         self.__generate_default_docs = generate_default_docs
+        self.__lazy_spec = lazy_spec
+        self.__validate_requests = validate_requests
+        self.__response_validation_rate = response_validation_rate
+        self.__prune_components = prune_components
+        self.__deduplicate_components = deduplicate_components
+        self.__hoist_components = hoist_components
+        self.__default_responses = list(default_responses or [])
+        # The models documented so far, whose cached schemas freeze_spec drops.
+        self.__models = dict.fromkeys(
+            response.model for response in self.__default_responses
+        )
+        self.__default_response_names = None
+        self.__pending_docs = []
+        self.__blueprints = []
+        self.__frozen_spec: Optional[bytes] = None
+        self.__spec_index = None
+
+        # Where the time goes while building the spec; see SpecStats.report().
+        self.spec_stats = SpecStats()
+        self.__plugin = next(
+            (p for p in spec.plugins if isinstance(p, PydanticPlugin)), None
+        )
+
+    def build_spec(self) -> APISpec:
+        """
+        Materialize any documentation that has been recorded but not yet
+        added to the spec, and return the spec.
+
+        When the app was created with lazy_spec=True, routes only record their
+        documentation; nothing is generated until this method is called (for
+        example, on the first request to /openapi.json). Calling it again is
+        cheap, and will only document routes added since the last call.
+        """
+        if self.__frozen_spec is not None:
+            raise TypeError(FROZEN_SPEC + " Use frozen_spec instead.")
+
+        while self.__pending_docs:
+            pending, self.__pending_docs = self.__pending_docs, []
+            # Pending entries are batched; pending blueprint merges are callables.
+            for is_merge, items in itertools.groupby(pending, callable):
+                if is_merge:
+                    for merge in items:
+                        merge()
+                else:
+                    self.__decorate_all(list(items))
+
+        return self.__spec
+
+    def spec_document(self) -> dict:
+        """
+        The spec as it is served and exported: build_spec().to_dict(), with
+        duplicate components replaced by aliases if the app was created with
+        deduplicate_components=True, then repeated parameters and responses
+        moved into the components if it was created with
+        hoist_components=True, and unused components removed if it was
+        created with prune_components=True (see
+        chalice_spec.documents.deduplicate, hoist_components and
+        tree_shake).
+
+        The spec itself keeps every component, as routes added later may
+        need them.
+        """
+        document = self.build_spec().to_dict()
+        # Deduplicating first makes more responses identical to hoist.
+        if self.__deduplicate_components:
+            document = deduplicate(document)
+        if self.__hoist_components:
+            document = hoist_components(document)
+        if self.__prune_components:
+            document = tree_shake(document)
+        return document
+
+    @property
+    def spec(self) -> Optional[APISpec]:
+        """
+        The app's APISpec as it is, without building recorded docs the way
+        build_spec() does. None once the spec has been frozen.
+        """
+        return self.__spec
+
+    @property
+    def frozen_spec(self) -> Optional[bytes]:
+        """
+        The serialized spec, once freeze_spec() has been called.
+        """
+        return self.__frozen_spec
+
+    def freeze_spec(self) -> bytes:
+        """
+        Build the spec, serialize it to compact JSON, and release everything
+        that was only needed to build it: the spec's paths and components,
+        the operations built from Docs, the cached schemas of its models
+        (which are generated again if another spec needs them), and the docs
+        recorded by blueprints registered with this app, once every app they
+        are registered with has frozen its spec. The serialized spec is kept
+        as app.frozen_spec, which chalice_spec_blueprint(app) serves from
+        then on.
+
+        Documenting routes or blueprints afterwards raises a TypeError, as
+        does build_spec(). The APISpec itself is emptied, so a blueprint
+        serving it directly (rather than the app) will serve an empty spec.
+        """
+        if self.__frozen_spec is not None:
+            return self.__frozen_spec
+
+        spec = self.build_spec()
+        self.__frozen_spec = serialize_document(self.spec_document()).encode("utf-8")
+
+        forget_built_operations(spec)
+        document = spec.to_dict()
+        document["paths"].clear()
+        for section in document.get("components", {}).values():
+            section.clear()
+        for blueprint in self.__blueprints:
+            blueprint._chalice_spec_apps.discard(self)
+            # Other apps may not have documented the blueprint's routes yet.
+            if not blueprint._chalice_spec_apps:
+                blueprint._chalice_spec_docs = None
+                blueprint._chalice_spec_fragments = {}
+        self.__blueprints = []
+        if self.__plugin:
+            self.__plugin.cache.forget(self.__models)
+        self.__models = {}
+        self.__spec = None
+        self.__plugin = None
+        self.__spec_index = None
+        self.__default_response_names = None
+
+        return self.__frozen_spec
+
+    def spec_index(self) -> SpecIndex:
+        """
+        An index over the spec's paths, tags and components, for selecting
+        parts of it (see query_spec). The index is rebuilt when routes have
+        been added since it was last used.
+        """
+        if self.__frozen_spec is not None:
+            if self.__spec_index is None or self.__spec_index[0] != "frozen":
+                document = json.loads(self.__frozen_spec)
+                self.__spec_index = ("frozen", SpecIndex(document))
+            return self.__spec_index[1]
+
+        revision = spec_revision(self.build_spec())
+        if self.__spec_index is None or self.__spec_index[0] != revision:
+            self.__spec_index = (revision, SpecIndex(self.spec_document()))
+        return self.__spec_index[1]
+
+    def query_spec(
+        self,
+        paths: Optional[List[str]] = None,
+        tags: Optional[List[str]] = None,
+        components: Optional[List[str]] = None,
+    ) -> dict:
+        """
+        Part of the spec, as a dict: only the operations under any of the
+        given path prefixes, with any of the given tags and using any of the
+        named components (each filter applies only if given), plus the
+        components those operations need.
+
+        For example, app.query_spec(components=["Address"]) documents every
+        operation whose requests or responses include an Address.
+        """
+        return self.spec_index().query(paths, tags, components)
+
+    def _document(self, entries) -> None:
+        """
+        Document (path, methods, content_types, docs, func, tags) entries now,
+        or record them for later if the spec is lazy.
+        """
+        if self.__frozen_spec is not None:
+            if any(entry[3] for entry in entries) or self.__generate_default_docs:
+                raise TypeError(FROZEN_SPEC)
+            return
+
+        if self.__lazy_spec:
+            self.__pending_docs.extend(entries)
+        else:
+            self.__decorate_all(entries)
+
+    def __default_responses_for(
+        self, blueprint: Optional["BlueprintWithSpec"] = None
+    ) -> Dict[int, str]:
+        """
+        The names of the default response components, by status code, for
+        routes of the app or of a blueprint. A blueprint's own defaults take
+        precedence over the app's.
+        """
+        if self.__default_response_names is None:
+            self.__default_response_names = register_default_responses(
+                self.__spec, self.__default_responses
+            )
+        if blueprint is None or not blueprint._chalice_spec_default_responses:
+            return self.__default_response_names
+        return {
+            **self.__default_response_names,
+            **register_default_responses(
+                self.__spec, blueprint._chalice_spec_default_responses
+            ),
+        }
+
+    @contextlib.contextmanager
+    def __recording(self) -> Iterator[None]:
+        """
+        Records the plugin's model times into this app's spec_stats. The
+        plugin may be shared with other apps, so it is only pointed at them
+        while this app builds.
+        """
+        if not self.__plugin:
+            yield
+            return
+        with self.__plugin.recording(self.spec_stats):
+            yield
+
+    def __merge_blueprint(
+        self, blueprint: "BlueprintWithSpec", url_prefix: Optional[str], routes: int
+    ) -> None:
+        with self.__recording():
+            self.__merge_compiled(blueprint, url_prefix, routes)
+
+    def __merge_compiled(
+        self, blueprint: "BlueprintWithSpec", url_prefix: Optional[str], routes: int
+    ) -> None:
+        stats = self.spec_stats
+        with stats.timed(stats.phase_seconds, "compile_fragments"):
+            fragment = blueprint.spec_fragment(
+                self.__spec,
+                self.__plugin,
+                self.__generate_default_docs,
+                stats,
+                routes,
+            )
+        self.__models.update(dict.fromkeys(fragment.models))
+        self.__models.update(
+            dict.fromkeys(
+                response.model for response in blueprint._chalice_spec_default_responses
+            )
+        )
+        fragment.merge(
+            self.__spec,
+            url_prefix,
+            blueprint._chalice_spec_tags,
+            stats,
+            self.__default_responses_for(blueprint),
+        )
+
+    def __decorate_all(self, entries) -> None:
+        with self.__recording():
+            self.__decorate_entries(entries)
+
+    def __decorate_entries(self, entries) -> None:
+        if self.__generate_default_docs:
+            entries = [
+                (
+                    path,
+                    methods,
+                    content_types,
+                    docs or default_docs_for_methods(methods, content_types),
+                    func,
+                    tags,
+                )
+                for path, methods, content_types, docs, func, tags in entries
+            ]
+
+        # Generate every model's schema in one pass, rather than route by route.
+        if self.__plugin and len(entries) > 1:
+            with self.spec_stats.timed(
+                self.spec_stats.phase_seconds, "register_models"
+            ):
+                self.__plugin.register_models(
+                    self.__spec,
+                    [
+                        model
+                        for entry in entries
+                        if entry[3]
+                        for model in entry[3].models()
+                    ],
+                )
+
+        for path, methods, content_types, docs, func, tags in entries:
+            self.decorate(docs, path, methods, content_types, func, tags)
 
     def decorate(self, docs, path, methods, content_types, func, tags) -> None:
+        with self.__recording(), self.spec_stats.timed(
+            self.spec_stats.route_seconds, path
+        ):
+            self.__decorate(docs, path, methods, content_types, func, tags)
+
+    def __decorate(self, docs, path, methods, content_types, func, tags) -> None:
+        stats = self.spec_stats
+
         if docs is None and self.__generate_default_docs:
             docs = default_docs_for_methods(methods, content_types)
 
         if docs:
-            operations = docs.build_operations(self.__spec, methods, content_types)
-
-            # Infer path parameters
-            get_params = r"{([^}]+)}"
-            path_params = []
-            for param in re.findall(get_params, path):
-                path_params.append(
-                    {
-                        "in": "path",
-                        "name": param,
-                        "schema": {"type": "string"},
-                        "required": True,
-                    }
+            self.__models.update(dict.fromkeys(docs.models()))
+            with stats.timed(stats.phase_seconds, "build_operations"):
+                operations = docs.build_operations(self.__spec, methods, content_types)
+
+            # Infer path parameters, tags, and summary and description from
+            # route docstrings
+            path_params = path_parameters(path)
+            apply_tags(operations, path, tags)
+            apply_default_responses(operations, self.__default_responses_for())
+            with stats.timed(stats.phase_seconds, "trim_docstring"):
+                apply_docstring(operations, func.__doc__)
+
+            with stats.timed(stats.phase_seconds, "spec_path"):
+                self.__spec.path(
+                    path,
+                    operations=operations,
+                    summary=docs.summary,
+                    parameters=path_params,
                 )
 
-            # Infer tags
-            for operation in operations:
-                if (
-                    "tags" not in operations[operation]
-                    or operations[operation]["tags"] is None
-                ):
-                    if tags:
-                        operations[operation]["tags"] = tags
-                    else:
-                        operations[operation]["tags"] = [
-                            "/" + path.lstrip("/").split("/", 1)[0]
-                        ]
-
-            # Infer summary and description from route docstrings
-            if func.__doc__:
-                split_docstring = trim_docstring(func.__doc__).split("\n", 1)
-                for operation in operations:
-                    if (
-                        "summary" not in operations[operation]
-                        or operations[operation]["summary"] is None
-                    ):
-                        operations[operation]["summary"] = split_docstring[0]
-                    if (
-                        "description" not in operations[operation]
-                        or operations[operation]["description"] is None
-                    ) and len(split_docstring) == 2:
-                        operations[operation]["description"] = split_docstring[
-                            1
-                        ].strip()
-
-            self.__spec.path(
-                path,
-                operations=operations,
-                summary=docs.summary,
-                parameters=path_params,
-            )
+    def __response_checks(
+        self,
+        docs: Docs,
+        methods: List[str],
+        blueprint: Optional[BlueprintWithSpec] = None,
+    ):
+        checks = {}
+        defaults = Operation(responses=self.__default_responses).responses
+        if blueprint and blueprint._chalice_spec_default_responses:
+            defaults = {
+                **defaults,
+                **Operation(
+                    responses=blueprint._chalice_spec_default_responses
+                ).responses,
+            }
+        for method, operation in docs.operations(methods).items():
+            rate = operation.response_validation_rate
+            if rate is None:
+                rate = self.__response_validation_rate
+            if rate > 0:
+                checks[method] = ResponseCheck(
+                    rate=rate,
+                    validators={
+                        code: {
+                            content_type: model_validator(response.model)
+                            for content_type, response in contents.items()
+                        }
+                        for code, contents in {
+                            **defaults,
+                            **operation.responses,
+                        }.items()
+                    },
+                )
+        return checks
 
     def register_blueprint(
         self,
@@ -158,23 +623,41 @@ class ChaliceWithSpec(Chalice):
         url_prefix: Optional[str] = None,
     ) -> None:
         if isinstance(blueprint, BlueprintWithSpec):
-            for (
-                path,
-                methods,
-                content_types,
-                docs,
-                func,
-            ) in blueprint._chalice_spec_docs:
-                path = (url_prefix if url_prefix else "") + path
-
-                self.decorate(
-                    docs,
-                    path,
-                    methods,
-                    content_types,
-                    func,
-                    blueprint._chalice_spec_tags,
-                )
+            if blueprint._chalice_spec_docs is None:
+                raise TypeError(RELEASED_BLUEPRINT)
+            if self.__frozen_spec is not None:
+                raise TypeError(FROZEN_SPEC)
+            self.__blueprints.append(blueprint)
+            blueprint._chalice_spec_apps.add(self)
+
+        if isinstance(blueprint, BlueprintWithSpec) and self.__plugin:
+            # Compile the blueprint once, and merge it in under this prefix.
+            merge = functools.partial(
+                self.__merge_blueprint,
+                blueprint,
+                url_prefix,
+                len(blueprint._chalice_spec_docs),
+            )
+            if self.__lazy_spec:
+                self.__pending_docs.append(merge)
+            else:
+                merge()
+        elif isinstance(blueprint, BlueprintWithSpec):
+            self._document(
+                [
+                    (
+                        (url_prefix if url_prefix else "") + path,
+                        methods,
+                        content_types,
+                        docs,
+                        func,
+                        blueprint._chalice_spec_tags,
+                    )
+                    for path, methods, content_types, docs, func in (
+                        blueprint._chalice_spec_docs
+                    )
+                ]
+            )
 
         return super(ChaliceWithSpec, self).register_blueprint(
             blueprint, name_prefix=name_prefix, url_prefix=url_prefix
@@ -183,11 +666,42 @@ class ChaliceWithSpec(Chalice):
     def route(self, path: str, **kwargs: Any) -> Callable[..., Any]:
         def route_decorator(func):
             docs: Docs = kwargs.pop("docs", None)
+            validate_request = kwargs.pop("validate_request", None)
             methods = [method.lower() for method in kwargs.get("methods", ["get"])]
             content_types = kwargs.get("content_types", None)
 
-            self.decorate(docs, path, methods, content_types, func, None)
+            self._document([(path, methods, content_types, docs, func, None)])
 
+            func = self._validated_view(func, docs, methods, validate_request)
             return super(ChaliceWithSpec, self).route(path, **kwargs)(func)
 
         return route_decorator
+
+    def _validated_view(
+        self,
+        func: Callable[..., Any],
+        docs: Optional[Docs],
+        methods: List[str],
+        validate_request: Optional[bool] = None,
+        blueprint: Optional[BlueprintWithSpec] = None,
+    ) -> Callable[..., Any]:
+        """
+        Wraps a route's view to validate its requests and sample its
+        responses, as configured for the route and for this app.
+        """
+        if validate_request is None:
+            validate_request = self.__validate_requests
+        if validate_request and docs:
+            validators = {
+                method: model_validator(model)
+                for method, model in docs.request_models(methods).items()
+            }
+            if validators:
+                func = validate_request_body(self, func, validators)
+
+        if docs:
+            checks = self.__response_checks(docs, methods, blueprint)
+            if checks:
+                func = sample_response_validation(self, func, checks)
+
+        return func
@@ -1,21 +1,113 @@
+from __future__ import annotations
+
 import sys
-from typing import Type, Optional, Union, List, Dict
+import weakref
+from collections.abc import Mapping
+from types import MappingProxyType
+from typing import TYPE_CHECKING, Type, Optional, Union, List, Dict, Tuple
 
-from apispec import APISpec
-from pydantic import BaseModel
+# Only needed for annotations, so that importing the docs types stays cheap.
+if TYPE_CHECKING:
+    from apispec import APISpec
+    from pydantic import BaseModel
 
 DEFAULT_DESCRIPTION = "Success"
 DEFAULT_CODE = 200
 DEFAULT_CONTENT_TYPE = "application/json"
 
 
-class Response:
+def _freeze(value):
+    """
+    A hashable equivalent of value, for comparing and hashing documentation
+    that holds dicts and lists (such as parameters and security).
+    """
+    if isinstance(value, Mapping):
+        return frozenset((key, _freeze(item)) for key, item in value.items())
+    if isinstance(value, (list, tuple)):
+        return tuple(_freeze(item) for item in value)
+    return value
+
+
+def _tuple(value):
+    return None if value is None else tuple(value)
+
+
+def _rebuild(cls, arguments: dict):
+    return cls(**arguments)
+
+
+class _Frozen:
+    """
+    Base for immutable, slotted documentation objects. Instances compare and
+    hash by value, so identical docs can be shared between routes and used as
+    cache keys.
+    """
+
+    __slots__ = ("_hash",)
+
+    _fields: Tuple[str, ...] = ()
+
+    def _set(self, name: str, value) -> None:
+        object.__setattr__(self, name, value)
+
+    def __setattr__(self, name, value):
+        raise AttributeError(f"{type(self).__name__} objects are immutable")
+
+    def __delattr__(self, name):
+        raise AttributeError(f"{type(self).__name__} objects are immutable")
+
+    def _key(self) -> tuple:
+        return tuple(_freeze(getattr(self, field)) for field in self._fields)
+
+    def __eq__(self, other):
+        if type(other) is not type(self):
+            return NotImplemented
+        return self is other or self._key() == other._key()
+
+    def __hash__(self):
+        try:
+            return self._hash
+        except AttributeError:
+            self._set("_hash", hash((type(self), self._key())))
+            return self._hash
+
+    def _arguments(self) -> dict:
+        """
+        The constructor arguments that would rebuild this object.
+        """
+        return {field: getattr(self, field) for field in self._fields}
+
+    def __reduce__(self):
+        # Slots can't be restored through the immutable __setattr__, and
+        # Operation.responses can't be pickled, so rebuild from arguments.
+        return _rebuild, (type(self), self._arguments())
+
+    def __copy__(self):
+        return self
+
+    def __deepcopy__(self, memo):
+        return self
+
+    def __repr__(self):
+        fields = ", ".join(
+            f"{field}={getattr(self, field)!r}"
+            for field in self._fields
+            if getattr(self, field) is not None
+        )
+        return f"{type(self).__name__}({fields})"
+
+
+class Response(_Frozen):
     """
     A response that your API might provide. Provide the Pydantic model,
     plus the HTTP status code that would be returned with this model,
     and an optional description.
     """
 
+    __slots__ = ("model", "code", "description", "content_type")
+
+    _fields = __slots__
+
     def __init__(
         self,
         model: type,
@@ -23,18 +115,36 @@ class Response:
         description: str = "Success",
         content_type: str = DEFAULT_CONTENT_TYPE,
     ):
-        self.model = model
-        self.code = code
-        self.description = description
-        self.content_type = content_type
+        self._set("model", model)
+        self._set("code", code)
+        self._set("description", description)
+        self._set("content_type", content_type)
 
 
-class Operation:
+class Operation(_Frozen):
     """
     Represents a single Operation, as defined by OpenAPI, which is generally
     a request, plus a set of responses.
+
+    Operations are immutable: list arguments are stored as tuples, and
+    responses as a read-only mapping of status code to content type to
+    Response.
     """
 
+    __slots__ = (
+        "summary",
+        "description",
+        "tags",
+        "parameters",
+        "content_types",
+        "request",
+        "security",
+        "response_validation_rate",
+        "responses",
+    )
+
+    _fields = __slots__
+
     def __init__(
         self,
         summary: str = None,
@@ -46,57 +156,137 @@ class Operation:
         response: Optional[Union[Response, Type[BaseModel]]] = None,
         responses: Optional[List[Response]] = None,
         security: Optional[List[Dict[str, List[str]]]] = None,
+        response_validation_rate: Optional[float] = None,
     ):
-        self.summary = summary
-        self.description = description
-        self.tags = tags
-        self.parameters = parameters
+        self._set("summary", summary)
+        self._set("description", description)
+        self._set("tags", _tuple(tags))
+        self._set("parameters", _tuple(parameters))
 
-        self.content_types = content_types
-        self.request = request
-        self.security = security
+        self._set("content_types", _tuple(content_types))
+        self._set("request", request)
+        self._set("security", _tuple(security))
+        self._set("response_validation_rate", response_validation_rate)
 
         if response and responses:
             raise TypeError("You must only pass one of response or responses")
 
         if response:
-            self._populate_response(response)
+            by_code = self._populate_response(response)
         else:
-            self._populate_responses(responses)
+            by_code = self._populate_responses(responses)
+
+        self._set(
+            "responses",
+            MappingProxyType(
+                {
+                    code: MappingProxyType(by_content_type)
+                    for code, by_content_type in by_code.items()
+                }
+            ),
+        )
 
-    def _populate_response(self, response: Union[Response, type]):
+    def _arguments(self) -> dict:
+        arguments = super()._arguments()
+        arguments["responses"] = [
+            response
+            for by_content_type in self.responses.values()
+            for response in by_content_type.values()
+        ]
+        return arguments
+
+    @staticmethod
+    def _populate_response(response: Union[Response, type]):
         if isinstance(response, Response):
             # If this is a Response object, we can track it as-is.
-            self.responses = {response.code: {DEFAULT_CONTENT_TYPE: response}}
+            return {response.code: {DEFAULT_CONTENT_TYPE: response}}
         else:
             # If not, we will use sensible defaults
-            self.responses = {
-                DEFAULT_CODE: {DEFAULT_CONTENT_TYPE: Response(model=response)}
-            }
+            return {DEFAULT_CODE: {DEFAULT_CONTENT_TYPE: Response(model=response)}}
 
-    def _populate_responses(self, responses: List[Response]):
-        self.responses = {}
+    @staticmethod
+    def _populate_responses(responses: List[Response]):
+        by_code = {}
         for response in responses:
-            if response.code not in self.responses:
-                self.responses[response.code] = {}
-            if response.content_type in self.responses[response.code]:
+            if response.code not in by_code:
+                by_code[response.code] = {}
+            if response.content_type in by_code[response.code]:
                 raise TypeError(
                     f"Multiple responses defined for {response.code} — {response.content_type}"
                 )
-            self.responses[response.code][response.content_type] = response
+            by_code[response.code][response.content_type] = response
+        return by_code
+
+
+Method = Union[Type["BaseModel"], Operation]
+
+
+# Operations already built for each spec, keyed on (docs, methods, content_types).
+_built_operations = weakref.WeakKeyDictionary()
 
+# Default responses added to each spec's components, keyed on (code, responses).
+_default_responses = weakref.WeakKeyDictionary()
 
-Method = Union[Type[BaseModel], Operation]
 
+def forget_built_operations(spec: APISpec) -> None:
+    """
+    Releases the operations Docs have built for a spec, and its default
+    responses.
+    """
+    _built_operations.pop(spec, None)
+    _default_responses.pop(spec, None)
 
-class Docs:
+
+def register_default_responses(
+    spec: APISpec, responses: List[Response]
+) -> Dict[int, str]:
+    """
+    Add responses shared by many operations, such as a 404 with an error
+    model, to the spec's components, and return the name of the component
+    for each status code. Components are named after their model and
+    status code, such as Error404, and are only added once per spec.
+    """
+    registered = _default_responses.setdefault(spec, {})
+    names = {}
+    for code, by_content_type in Operation(responses=responses).responses.items():
+        key = (code, tuple(by_content_type.values()))
+        if key not in registered:
+            operation = Docs._build_operation_from_operation(
+                Operation(responses=key[1]), spec
+            )
+            base = f"{key[1][0].model.__name__}{code}"
+            name, number = base, 1
+            while name in spec.components.responses:
+                number += 1
+                name = f"{base}_{number}"
+            spec.components.response(name, operation["responses"][code])
+            registered[key] = name
+        names[code] = registered[key]
+    return names
+
+
+class Docs(_Frozen):
     """
     Chalice-Spec documentation for an API endpoint that will eventually
     result in an OpenAPI spec!
+
+    Docs are immutable and compare by value, so the same (or an identical)
+    Docs can be shared by any number of routes.
     """
 
     methods = ["get", "post", "put", "patch", "delete", "head", "options"]
 
+    __slots__ = (
+        "summary",
+        "content_types",
+        "request",
+        "response",
+        "responses",
+        *methods,
+    )
+
+    _fields = __slots__
+
     def __init__(
         self,
         summary: str = None,
@@ -112,20 +302,20 @@ class Docs:
         response: Union[Response, Type[BaseModel]] = None,
         responses: List[Response] = None,
     ):
-        self.summary = summary
+        self._set("summary", summary)
 
-        self.content_types = content_types
-        self.request = request
-        self.response = response
-        self.responses = responses
+        self._set("content_types", _tuple(content_types))
+        self._set("request", request)
+        self._set("response", response)
+        self._set("responses", _tuple(responses))
 
-        self.get = get
-        self.post = post
-        self.put = put
-        self.patch = patch
-        self.delete = delete
-        self.head = head
-        self.options = options
+        self._set("get", get)
+        self._set("post", post)
+        self._set("put", put)
+        self._set("patch", patch)
+        self._set("delete", delete)
+        self._set("head", head)
+        self._set("options", options)
 
         # check to make sure we haven't violated the contract
         if self.request or self.response or self.responses:
@@ -135,6 +325,71 @@ class Docs:
                         "You must choose either a short-hand or long-hand Docs, not both."
                     )
 
+    def models(self) -> List[type]:
+        """
+        Every request and response model used by these docs, without
+        duplicates, in the order they are documented.
+        """
+        models = [self.request]
+        if isinstance(self.response, Response):
+            models.append(self.response.model)
+        else:
+            models.append(self.response)
+        models.extend(response.model for response in self.responses or [])
+
+        for method in self.methods:
+            method = getattr(self, method)
+            if isinstance(method, Operation):
+                models.append(method.request)
+                for response_contents in method.responses.values():
+                    models.extend(
+                        response.model for response in response_contents.values()
+                    )
+            else:
+                models.append(method)
+
+        return [model for model in dict.fromkeys(models) if model is not None]
+
+    def operations(self, methods: List[str]) -> Dict[str, Operation]:
+        """
+        The Operation documented for each of the given methods, keyed by
+        lower-case method, with models expanded into Operations.
+        """
+        if self.request or self.response or self.responses:
+            if len(methods) != 1 or not (self.response or self.responses):
+                return {}
+            return {
+                methods[0].lower(): Operation(
+                    request=self.request,
+                    response=self.response,
+                    responses=self.responses,
+                )
+            }
+
+        operations = {}
+        for method in methods:
+            operation = getattr(self, method.lower(), None)
+            if isinstance(operation, Operation):
+                operations[method.lower()] = operation
+            elif operation:
+                operations[method.lower()] = Operation(response=operation)
+        return operations
+
+    def request_models(self, methods: List[str]) -> Dict[str, Type[BaseModel]]:
+        """
+        The request model documented for each of the given methods, keyed by
+        lower-case method. Methods without a request model are left out.
+        """
+        if self.request:
+            return {methods[0].lower(): self.request} if len(methods) == 1 else {}
+
+        models = {}
+        for method in methods:
+            operation = getattr(self, method.lower(), None)
+            if isinstance(operation, Operation) and operation.request:
+                models[method.lower()] = operation.request
+        return models
+
     @classmethod
     def _build_operation_from_operation(
         cls, method: Operation, spec: APISpec, content_types: List[str] = None
@@ -188,11 +443,11 @@ class Docs:
         if method.description:
             operation["description"] = method.description
         if method.tags:
-            operation["tags"] = method.tags
+            operation["tags"] = list(method.tags)
         if method.parameters:
-            operation["parameters"] = method.parameters
+            operation["parameters"] = list(method.parameters)
         if method.security:
-            operation["security"] = method.security
+            operation["security"] = list(method.security)
 
         return operation
 
@@ -226,6 +481,26 @@ class Docs:
 
     def build_operations(
         self, spec: APISpec, methods: List[str], content_types: List[str] = None
+    ):
+        """
+        Build the OpenAPI operations for these docs, registering any models
+        with the spec.
+
+        Docs are often shared by many routes, so operations are only built
+        once per spec, methods and content types, and equal Docs share their
+        operations. Each call returns fresh copies of the operation dicts,
+        which the caller may add keys to (as ChaliceWithSpec does for tags and
+        summaries); nested values are shared.
+        """
+        key = (self, tuple(methods), tuple(content_types) if content_types else None)
+        built = _built_operations.setdefault(spec, {})
+        if key not in built:
+            built[key] = self._build_operations(spec, methods, content_types)
+
+        return {method: dict(operation) for method, operation in built[key].items()}
+
+    def _build_operations(
+        self, spec: APISpec, methods: List[str], content_types: List[str] = None
     ):
         operations = {}
 
@@ -0,0 +1,663 @@
+"""
+Helpers for serialized OpenAPI documents, that is the plain dicts produced by
+APISpec.to_dict() or read back from JSON. Like chalice_spec.runtime, this
+module only needs the standard library, so documents can be split and
+transformed at runtime without apispec.
+"""
+
+import json
+import re
+from typing import Dict, Iterable, Iterator, List, Optional, Set, Tuple
+
+# Where components live: OpenAPI 3 keeps them in sections of "components",
+# OpenAPI 2 at the top level.
+V2_CONTAINERS = [("definitions",), ("parameters",), ("responses",)]
+
+# Components that are referenced by name rather than by $ref, which are
+# always kept.
+BY_NAME = {("components", "securitySchemes"), ("securityDefinitions",)}
+
+Pointer = Tuple[str, ...]
+
+# An operation, as its path and lower-case method.
+OperationKey = Tuple[str, str]
+
+# Path items also hold summaries, descriptions, servers and parameters.
+METHODS = {"get", "put", "post", "delete", "options", "head", "patch", "trace"}
+
+# Objects whose keys are names chosen by the spec's author, such as property
+# or schema names, rather than keywords.
+NAMED_MAPS = {
+    "callbacks",
+    "content",
+    "definitions",
+    "encoding",
+    "headers",
+    "links",
+    "mapping",
+    "parameters",
+    "paths",
+    "patternProperties",
+    "properties",
+    "requestBodies",
+    "responses",
+    "schemas",
+    "securityDefinitions",
+    "securitySchemes",
+    "variables",
+}
+
+# Keywords whose values are data, such as a schema's default, rather than
+# more of the spec. Like extensions (x-...), they are copied as they are.
+LITERALS = {"const", "default", "enum", "example", "examples", "value"}
+
+# Keywords that mean the same when empty as when left out.
+EMPTY_DEFAULTS = {
+    "content",
+    "headers",
+    "links",
+    "parameters",
+    "properties",
+    "required",
+    "servers",
+    "tags",
+}
+
+# Keywords that are only there for people reading the spec.
+DOCUMENTATION = ("description", "summary", "example", "examples")
+
+# The ways a spec can be served: the keywords each leaves out, or None to
+# serve the document as it is. See minify.
+PROFILES = {"full": None, "compact": (), "minified": DOCUMENTATION}
+
+# Passed as the parent of response objects within minify.
+_RESPONSE = object()
+
+
+def serialize_document(document: dict, indent: Optional[int] = None) -> str:
+    """
+    Serializes a document to JSON. Unless an indent is given, this matches
+    the compact separators Chalice uses when it serializes a dict.
+    """
+    separators = (",", ":") if indent is None else None
+    return json.dumps(document, indent=indent, separators=separators)
+
+
+def references(node) -> Iterator[str]:
+    """
+    Every $ref within a part of a document.
+    """
+    if isinstance(node, dict):
+        for key, value in node.items():
+            if key == "$ref" and isinstance(value, str):
+                yield value
+            else:
+                yield from references(value)
+    elif isinstance(node, list):
+        for item in node:
+            yield from references(item)
+
+
+def ref_pointer(ref: str) -> Optional[Pointer]:
+    """
+    The path within the document that a local $ref points to, such as
+    ("components", "schemas", "Pet") for "#/components/schemas/Pet", or None
+    for references to other documents.
+    """
+    if not ref.startswith("#/"):
+        return None
+    return tuple(
+        part.replace("~1", "/").replace("~0", "~") for part in ref[2:].split("/")
+    )
+
+
+def ref_string(pointer: Pointer) -> str:
+    """
+    The local $ref for a path within the document; the inverse of
+    ref_pointer.
+    """
+    return "#/" + "/".join(
+        part.replace("~", "~0").replace("/", "~1") for part in pointer
+    )
+
+
+def resolve(document: dict, pointer: Pointer):
+    """
+    The value at a path within the document, or None if there is none.
+    """
+    node = document
+    for part in pointer:
+        if not isinstance(node, dict) or part not in node:
+            return None
+        node = node[part]
+    return node
+
+
+def referenced(document: dict, node) -> Set[Pointer]:
+    """
+    The transitive closure of the components referenced from a part of the
+    document: everything it references, everything they reference, and so
+    on.
+    """
+    seen: Set[Pointer] = set()
+    pending = [node]
+    while pending:
+        for ref in references(pending.pop()):
+            pointer = ref_pointer(ref)
+            if pointer is None or pointer in seen:
+                continue
+            seen.add(pointer)
+            target = resolve(document, pointer)
+            if target is not None:
+                pending.append(target)
+    return seen
+
+
+def component_containers(document: dict) -> List[Pointer]:
+    """
+    The dicts of components in the document that $refs point into.
+    """
+    if "components" in document:
+        return [
+            ("components", section)
+            for section in document["components"]
+            if ("components", section) not in BY_NAME
+        ]
+    return [container for container in V2_CONTAINERS if container[0] in document]
+
+
+def component_pointers(document: dict) -> List[Pointer]:
+    """
+    Every component in the document that can be referenced with a $ref.
+    """
+    return [
+        container + (name,)
+        for container in component_containers(document)
+        for name in resolve(document, container)
+    ]
+
+
+def reference_graph(document: dict) -> Dict[str, Set[Pointer]]:
+    """
+    The components each operation (as "GET /users"), path (for parameters
+    shared by its operations) and component (as its $ref) references
+    directly.
+    """
+    graph = {}
+    for path, path_item in document.get("paths", {}).items():
+        for key, value in path_item.items():
+            referrer = f"{key.upper()} {path}" if key in METHODS else path
+            targets = {ref_pointer(ref) for ref in references(value)} - {None}
+            if targets:
+                graph.setdefault(referrer, set()).update(targets)
+    for pointer in component_pointers(document):
+        targets = {ref_pointer(ref) for ref in references(resolve(document, pointer))}
+        graph[ref_string(pointer)] = targets - {None}
+    return graph
+
+
+def fan_in(document: dict) -> Dict[str, int]:
+    """
+    How many operations, paths and components reference each component
+    directly, keyed by the component's $ref. Unreferenced components have a
+    fan-in of 0, but may still be needed through the document's other
+    top-level keys (see tree_shake).
+    """
+    counts = {ref_string(pointer): 0 for pointer in component_pointers(document)}
+    for targets in reference_graph(document).values():
+        for target in targets:
+            ref = ref_string(target)
+            if ref in counts:
+                counts[ref] += 1
+    return counts
+
+
+def tree_shake(document: dict) -> dict:
+    """
+    A copy of the document without the components that nothing outside the
+    components, such as paths or webhooks, needs, even indirectly. Like
+    subset(), it shares values with the original document.
+    """
+    containers = {container[0] for container in component_containers(document)}
+    roots = {key: value for key, value in document.items() if key not in containers}
+    return subset(document, document.get("paths", {}), referenced(document, roots))
+
+
+def unused_components(document: dict) -> List[str]:
+    """
+    The $refs of the components tree_shake removes.
+    """
+    needed = set(component_pointers(tree_shake(document)))
+    return [
+        ref_string(pointer)
+        for pointer in component_pointers(document)
+        if pointer not in needed
+    ]
+
+
+def _replace_refs(node, refs: Dict[str, str]):
+    if isinstance(node, dict):
+        if isinstance(node.get("$ref"), str) and node["$ref"] in refs:
+            return dict(node, **{"$ref": refs[node["$ref"]]})
+        return {key: _replace_refs(value, refs) for key, value in node.items()}
+    if isinstance(node, list):
+        return [_replace_refs(item, refs) for item in node]
+    return node
+
+
+def _shape(component, refs: Dict[str, str]) -> str:
+    if isinstance(component, dict):
+        component = {key: value for key, value in component.items() if key != "title"}
+    return json.dumps(_replace_refs(component, refs), sort_keys=True)
+
+
+def duplicate_components(document: dict) -> Dict[str, str]:
+    """
+    The components that are structurally identical to an earlier component
+    of the same kind, mapping each one's $ref to the $ref of the first.
+
+    Components are compared ignoring their own title, which Pydantic sets to
+    the model's name, and treating references to identical components as
+    equal, so two models that each nest an identical model are duplicates
+    too.
+    """
+    canonical: Dict[str, str] = {}
+    while True:
+        found: Dict[str, str] = {}
+        for container in component_containers(document):
+            first: Dict[str, str] = {}
+            for name, component in resolve(document, container).items():
+                ref = ref_string(container + (name,))
+                shape = _shape(component, canonical)
+                if shape in first:
+                    found[ref] = first[shape]
+                else:
+                    first[shape] = ref
+        if found == canonical:
+            return canonical
+        canonical = found
+
+
+def deduplicate(document: dict) -> dict:
+    """
+    A copy of the document in which every duplicate component (see
+    duplicate_components) is replaced by a $ref alias to the first
+    identical component, and every other $ref to it points to that
+    component directly. The aliases keep the duplicates' names valid for
+    anything that refers to them from outside the document; tree_shake
+    removes them.
+    """
+    aliases = duplicate_components(document)
+    if not aliases:
+        return document
+    result = _replace_refs(document, aliases)
+    for alias, ref in aliases.items():
+        pointer = ref_pointer(alias)
+        resolve(result, pointer[:-1])[pointer[-1]] = {"$ref": ref}
+    return result
+
+
+def _response_name(code: str, response: dict) -> str:
+    schemas = {
+        media.get("schema", {}).get("$ref")
+        for media in response.get("content", {}).values()
+    }
+    if "schema" in response:
+        schemas.add(response["schema"].get("$ref"))
+    if len(schemas) == 1 and None not in schemas:
+        return f"{ref_pointer(schemas.pop())[-1]}{code}"
+    return f"Response{code}"
+
+
+def hoist_components(document: dict, min_uses: int = 2) -> dict:
+    """
+    A copy of the document in which every parameter and response that
+    appears inline at least min_uses times is moved into the components
+    (for OpenAPI 2, the top-level parameters and responses) and replaced by
+    $refs, such as the path parameter of every /{id} route or a 404 shared
+    by many operations. Parameters are named after their location and name,
+    such as path.id, and responses after their schema and status code, such
+    as Error404. Like subset(), it shares values with the original document.
+    """
+    kinds = ("parameters", "responses")
+    if "swagger" in document:
+        containers = {kind: (kind,) for kind in kinds}
+    else:
+        containers = {kind: ("components", kind) for kind in kinds}
+
+    uses: Dict[Tuple[str, str], int] = {}
+    found: Dict[Tuple[str, str], Tuple[str, dict]] = {}
+
+    def count(kind: str, base: str, value) -> None:
+        if not isinstance(value, dict) or "$ref" in value:
+            return
+        key = (kind, json.dumps(value, sort_keys=True))
+        uses[key] = uses.get(key, 0) + 1
+        found.setdefault(key, (base, value))
+
+    def parameter_name(parameter: dict) -> str:
+        return f"{parameter.get('in')}.{parameter.get('name')}"
+
+    for path_item in document.get("paths", {}).values():
+        for parameter in path_item.get("parameters", []):
+            count("parameters", parameter_name(parameter), parameter)
+        for method, operation in path_item.items():
+            if method not in METHODS:
+                continue
+            for parameter in operation.get("parameters", []):
+                count("parameters", parameter_name(parameter), parameter)
+            for code, response in operation.get("responses", {}).items():
+                count("responses", _response_name(code, response), response)
+
+    hoisted: Dict[Tuple[str, str], Dict[str, str]] = {}
+    added = {kind: {} for kind in kinds}
+    for key, (base, value) in found.items():
+        if uses[key] < min_uses:
+            continue
+        kind = key[0]
+        taken = set(resolve(document, containers[kind]) or {}) | set(added[kind])
+        name = re.sub(r"[^A-Za-z0-9_.-]+", "-", base)
+        candidate, number = name, 1
+        while candidate in taken:
+            number += 1
+            candidate = f"{name}_{number}"
+        added[kind][candidate] = value
+        hoisted[key] = {"$ref": ref_string(containers[kind] + (candidate,))}
+
+    if not hoisted:
+        return document
+
+    def replace(kind: str, value):
+        if not isinstance(value, dict) or "$ref" in value:
+            return value
+        return hoisted.get((kind, json.dumps(value, sort_keys=True)), value)
+
+    def replace_parameters(item: dict) -> dict:
+        if "parameters" not in item:
+            return item
+        return dict(
+            item,
+            parameters=[replace("parameters", value) for value in item["parameters"]],
+        )
+
+    paths = {}
+    for path, path_item in document["paths"].items():
+        path_item = dict(replace_parameters(path_item))
+        for method, operation in path_item.items():
+            if method not in METHODS:
+                continue
+            operation = replace_parameters(operation)
+            if "responses" in operation:
+                operation = dict(
+                    operation,
+                    responses={
+                        code: replace("responses", response)
+                        for code, response in operation["responses"].items()
+                    },
+                )
+            path_item[method] = operation
+        paths[path] = path_item
+
+    result = dict(document, paths=paths)
+    if "swagger" not in document:
+        result["components"] = dict(document.get("components", {}))
+    for kind, components in added.items():
+        if components:
+            container = containers[kind]
+            parent = result if len(container) == 1 else result["components"]
+            parent[container[-1]] = {**parent.get(container[-1], {}), **components}
+    return result
+
+
+def minify(document: dict, strip: Iterable[str] = DOCUMENTATION) -> dict:
+    """
+    A copy of the document for machines rather than people, such as
+    gateways and contract checkers: without the keywords in strip
+    (descriptions, summaries and examples by default) and without the
+    EMPTY_DEFAULTS that are empty, such as the properties of a model
+    without fields. Descriptions of responses are required, so they are
+    emptied rather than left out. Names, such as a property called
+    "description", are never removed, and LITERALS, such as a default, are
+    kept as they are.
+    """
+    strip = set(strip)
+
+    def walk(node, parent=None):
+        if isinstance(node, list):
+            return [walk(item) for item in node]
+        if not isinstance(node, dict):
+            return node
+        if parent in NAMED_MAPS:
+            kind = _RESPONSE if parent == "responses" else None
+            return {key: walk(value, kind) for key, value in node.items()}
+
+        result = {}
+        for key, value in node.items():
+            if key in strip:
+                if key == "description" and parent is _RESPONSE:
+                    result[key] = ""
+                continue
+            if key in LITERALS or str(key).startswith("x-"):
+                result[key] = value
+                continue
+            value = walk(value, key)
+            if key in EMPTY_DEFAULTS and not value:
+                continue
+            result[key] = value
+        return result
+
+    return walk(document)
+
+
+def subset(
+    document: dict, paths: Dict[str, dict], needed: Optional[Set[Pointer]] = None
+) -> dict:
+    """
+    A copy of the document with only the given paths, and only the
+    components those paths need. Values are shared with the original
+    document, so the result should not be modified.
+
+    If the components the paths need are already known, pass them as needed
+    to avoid walking the paths again.
+    """
+    if needed is None:
+        needed = referenced(document, paths)
+    result = dict(document, paths=paths)
+    if "components" in document:
+        result["components"] = dict(document["components"])
+
+    for container in component_containers(document):
+        components = resolve(document, container)
+        kept = {
+            name: component
+            for name, component in components.items()
+            if container + (name,) in needed
+        }
+        parent = result if len(container) == 1 else result["components"]
+        if kept:
+            parent[container[-1]] = kept
+        else:
+            del parent[container[-1]]
+
+    if "components" in result and not result["components"]:
+        del result["components"]
+    return result
+
+
+def operation_tags(document: dict) -> List[str]:
+    """
+    Every tag used by an operation, in the order of the document's tags list
+    and then of first use.
+    """
+    tags = {tag["name"]: None for tag in document.get("tags", [])}
+    used = {}
+    for path_item in document.get("paths", {}).values():
+        for method, operation in path_item.items():
+            if method in METHODS:
+                used.update(dict.fromkeys(operation.get("tags") or []))
+    return [tag for tag in {**tags, **used} if tag in used]
+
+
+def split_by_tag(document: dict) -> Dict[str, dict]:
+    """
+    A document for each tag, with only the operations that have that tag
+    and the components they need. Operations with several tags appear in
+    each of their documents, and untagged operations in none.
+    """
+    documents = {}
+    for tag in operation_tags(document):
+        paths = {}
+        for path, path_item in document["paths"].items():
+            operations = {
+                key: value
+                for key, value in path_item.items()
+                if key in METHODS and tag in (value.get("tags") or [])
+            }
+            if operations:
+                paths[path] = dict(
+                    {
+                        key: value
+                        for key, value in path_item.items()
+                        if key not in METHODS
+                    },
+                    **operations,
+                )
+        tagged = subset(document, paths)
+        if "tags" in document:
+            tagged["tags"] = [t for t in document["tags"] if t["name"] == tag]
+        documents[tag] = tagged
+    return documents
+
+
+def slugs(names: List[str], reserved=()) -> Dict[str, str]:
+    """
+    A distinct, URL-safe slug for each name, none of which are reserved.
+    """
+    result, taken = {}, set(reserved)
+    for name in names:
+        slug = re.sub(r"[^A-Za-z0-9_.-]+", "-", name).strip("-.") or "tag"
+        candidate, number = slug, 1
+        while candidate in taken:
+            number += 1
+            candidate = f"{slug}-{number}"
+        taken.add(candidate)
+        result[name] = candidate
+    return result
+
+
+class _PathNode:
+    __slots__ = ("children", "paths")
+
+    def __init__(self):
+        self.children: Dict[str, "_PathNode"] = {}
+        self.paths: List[str] = []
+
+    def all_paths(self) -> Iterator[str]:
+        yield from self.paths
+        for child in self.children.values():
+            yield from child.all_paths()
+
+
+class SpecIndex:
+    """
+    An index over a document, for answering queries such as "the operations
+    under /users tagged billing" or "every operation that uses the Address
+    schema" with a minimal, self-contained document, without walking the
+    whole document for each query.
+
+    The index holds:
+
+    - a trie of path segments, so that a prefix finds the paths under it
+    - the operations with each tag
+    - the operations that use each component, directly or through other
+      components, and the components each operation needs.
+    """
+
+    def __init__(self, document: dict):
+        self.document = document
+        self.operations: List[OperationKey] = []
+        self.tags: Dict[str, List[OperationKey]] = {}
+        self.components: Dict[str, Set[OperationKey]] = {}
+        self._needed: Dict[OperationKey, Set[Pointer]] = {}
+        self._root = _PathNode()
+
+        for path, path_item in document.get("paths", {}).items():
+            node = self._root
+            for segment in self._segments(path):
+                node = node.children.setdefault(segment, _PathNode())
+            node.paths.append(path)
+
+            shared = referenced(document, path_item.get("parameters", []))
+            for method, operation in path_item.items():
+                if method not in METHODS:
+                    continue
+                key = (path, method)
+                self.operations.append(key)
+                for tag in operation.get("tags") or []:
+                    self.tags.setdefault(tag, []).append(key)
+                needed = shared | referenced(document, operation)
+                self._needed[key] = needed
+                for pointer in needed:
+                    self.components.setdefault(pointer[-1], set()).add(key)
+
+    @staticmethod
+    def _segments(path: str) -> List[str]:
+        return [segment for segment in path.split("/") if segment]
+
+    def under(self, prefix: str) -> List[str]:
+        """
+        The paths equal to or below a prefix, by whole segments: /users
+        matches /users and /users/{id}, but not /users-admin.
+        """
+        node = self._root
+        for segment in self._segments(prefix):
+            node = node.children.get(segment)
+            if node is None:
+                return []
+        return list(node.all_paths())
+
+    def select(
+        self,
+        paths: Optional[Iterable[str]] = None,
+        tags: Optional[Iterable[str]] = None,
+        components: Optional[Iterable[str]] = None,
+    ) -> List[OperationKey]:
+        """
+        The operations matching every filter given: under any of the path
+        prefixes, with any of the tags, and using any of the components
+        (by name, such as a schema's name).
+        """
+        selected = set(self.operations)
+        if paths is not None:
+            matched = {path for prefix in paths for path in self.under(prefix)}
+            selected &= {key for key in selected if key[0] in matched}
+        if tags is not None:
+            selected &= {key for tag in tags for key in self.tags.get(tag, [])}
+        if components is not None:
+            selected &= {
+                key for name in components for key in self.components.get(name, ())
+            }
+        return [key for key in self.operations if key in selected]
+
+    def query(
+        self,
+        paths: Optional[Iterable[str]] = None,
+        tags: Optional[Iterable[str]] = None,
+        components: Optional[Iterable[str]] = None,
+    ) -> dict:
+        """
+        A document with only the operations select() returns, and the
+        components they need. Like subset(), it shares values with the
+        indexed document.
+        """
+        selected: Dict[str, dict] = {}
+        needed: Set[Pointer] = set()
+        for path, method in self.select(paths, tags, components):
+            path_item = self.document["paths"][path]
+            if path not in selected:
+                selected[path] = {
+                    key: value for key, value in path_item.items() if key not in METHODS
+                }
+            selected[path][method] = path_item[method]
+            needed |= self._needed[(path, method)]
+        return subset(self.document, selected, needed)
@@ -0,0 +1,181 @@
+import re
+from copy import deepcopy
+from typing import Dict, List, NamedTuple, Optional
+
+from apispec import APISpec
+
+from chalice_spec.docs import trim_docstring
+from chalice_spec.pydantic import PydanticPlugin
+from chalice_spec.stats import SpecStats
+
+
+class FragmentPath(NamedTuple):
+    """
+    One blueprint route, with its operations built but not yet prefixed.
+    Operations without tags of their own are tagged when they are merged,
+    as their default tag depends on the url_prefix.
+    """
+
+    path: str
+    operations: Dict[str, dict]
+    summary: Optional[str]
+
+
+def path_parameters(path: str) -> List[dict]:
+    """
+    The OpenAPI parameters for each {parameter} in a route's path.
+    """
+    return [
+        {
+            "in": "path",
+            "name": param,
+            "schema": {"type": "string"},
+            "required": True,
+        }
+        for param in re.findall(r"{([^}]+)}", path)
+    ]
+
+
+def apply_docstring(operations: Dict[str, dict], docstring: Optional[str]) -> None:
+    """
+    Fills in each operation's summary and description from a route's
+    docstring, unless they have been set explicitly.
+    """
+    if not docstring:
+        return
+    split_docstring = trim_docstring(docstring).split("\n", 1)
+    for operation in operations.values():
+        if operation.get("summary") is None:
+            operation["summary"] = split_docstring[0]
+        if operation.get("description") is None and len(split_docstring) == 2:
+            operation["description"] = split_docstring[1].strip()
+
+
+def apply_tags(operations: Dict[str, dict], path: str, tags: List[str]) -> None:
+    """
+    Tags each untagged operation with the given tags or, without any, with
+    the first segment of the route's path.
+    """
+    for operation in operations.values():
+        if operation.get("tags") is None:
+            operation["tags"] = (
+                tags if tags else ["/" + path.lstrip("/").split("/", 1)[0]]
+            )
+
+
+def apply_default_responses(
+    operations: Dict[str, dict], defaults: Optional[Dict[int, str]]
+) -> None:
+    """
+    Refers each operation to the default response component (see
+    register_default_responses) for every status code it does not document
+    itself.
+    """
+    if not defaults:
+        return
+    for operation in operations.values():
+        responses = operation.get("responses") or {}
+        documented = {str(code) for code in responses}
+        operation["responses"] = {
+            **responses,
+            **{
+                code: name
+                for code, name in defaults.items()
+                if str(code) not in documented
+            },
+        }
+
+
+class SpecFragment:
+    """
+    The documentation of a blueprint's routes, compiled once, that can be
+    merged into any number of specs under any url_prefix.
+
+    Compiling builds every operation and generates every schema against a
+    private spec, which is then discarded. Merging only copies operation
+    dicts, prefixes their paths and adds the schemas the target spec does
+    not have yet, so registering a blueprint into several apps, or under
+    several prefixes, only pays for schema generation once.
+    """
+
+    def __init__(
+        self,
+        paths: List[FragmentPath],
+        schemas: Dict[str, dict],
+        models: Optional[List[type]] = None,
+    ):
+        self.paths = paths
+        self.schemas = schemas
+        # The models the fragment documents, without their nested models.
+        self.models = models or []
+
+    @classmethod
+    def compile(
+        cls,
+        entries,
+        openapi_version: str,
+        plugin: PydanticPlugin,
+        stats: Optional[SpecStats] = None,
+    ) -> "SpecFragment":
+        """
+        Compiles (path, methods, content_types, docs, func) entries, using a
+        plugin like the given one for schemas.
+        """
+        spec = APISpec(
+            title="fragment",
+            version="0",
+            openapi_version=openapi_version,
+            plugins=[type(plugin)(cache=plugin.cache, stats=stats)],
+        )
+        models = list(
+            dict.fromkeys(
+                model for entry in entries if entry[3] for model in entry[3].models()
+            )
+        )
+        spec.plugins[0].register_models(spec, models)
+
+        paths = []
+        for path, methods, content_types, docs, func in entries:
+            if not docs:
+                continue
+            operations = docs.build_operations(spec, methods, content_types)
+            apply_docstring(operations, func.__doc__)
+            paths.append(FragmentPath(path, operations, docs.summary))
+
+        return cls(paths, dict(spec.components.schemas), models)
+
+    def merge(
+        self,
+        spec: APISpec,
+        url_prefix: Optional[str] = None,
+        tags: Optional[List[str]] = None,
+        stats: Optional[SpecStats] = None,
+        default_responses: Optional[Dict[int, str]] = None,
+    ) -> None:
+        """
+        Adds the fragment's schemas and paths to a spec, with every path
+        prefixed by url_prefix. Schemas whose names the spec already has are
+        left alone, as they would be when documenting routes directly. The
+        spec gets copies, so specs never share the fragment's objects.
+
+        default_responses are the names of the spec's response components
+        that operations fall back to, by status code.
+        """
+        schemas = spec.components.schemas
+        for name, schema in self.schemas.items():
+            if name not in schemas:
+                schemas[name] = deepcopy(schema)
+
+        stats = stats or SpecStats()
+        for path, operations, summary in self.paths:
+            path = (url_prefix or "") + path
+            with stats.timed(stats.route_seconds, path):
+                operations = deepcopy(operations)
+                apply_tags(operations, path, tags)
+                apply_default_responses(operations, default_responses)
+                spec.path(
+                    path,
+                    operations=operations,
+                    summary=summary,
+                    parameters=path_parameters(path),
+                )
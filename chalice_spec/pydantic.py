@@ -1,9 +1,415 @@
-from typing import Any, Union
+import hashlib
+import inspect
+import json
+import os
+import re
+import sys
+import tempfile
+import time
+import weakref
+from contextlib import contextmanager
+from copy import deepcopy
+from typing import (
+    Any,
+    Callable,
+    Dict,
+    Iterable,
+    Iterator,
+    List,
+    NamedTuple,
+    Optional,
+    Set,
+    Tuple,
+    Type,
+    Union,
+)
 
+import pydantic
 from apispec import BasePlugin, APISpec
-from apispec.exceptions import DuplicateComponentNameError
 from pydantic import BaseModel
 
+from chalice_spec.stats import SpecStats
+
+PYDANTIC_V2 = str(pydantic.VERSION).startswith("2.")
+
+if PYDANTIC_V2:
+    from pydantic import TypeAdapter
+else:
+    from pydantic.schema import (
+        get_flat_models_from_models,
+        get_model_name_map,
+        schema as models_schema,
+    )
+
+REF_TEMPLATE = "#/components/schemas/{model}"
+
+# Bump whenever the format of cached schemas changes.
+DISK_CACHE_VERSION = "1"
+
+
+class CacheInfo(NamedTuple):
+    hits: int
+    misses: int
+    size: int
+    disk_hits: int = 0
+
+
+def _field_types(model: Type[BaseModel]) -> list:
+    fields = getattr(model, "model_fields", None)
+    if fields is not None:
+        return [field.annotation for field in fields.values()]
+    return [field.outer_type_ for field in model.__fields__.values()]
+
+
+def _nested_models(model: Type[BaseModel]) -> list:
+    """
+    Returns the model and every model reachable from its fields.
+    """
+    models = []
+    pending = [model]
+    while pending:
+        current = pending.pop()
+        if isinstance(current, type) and issubclass(current, BaseModel):
+            if current in models:
+                continue
+            models.append(current)
+            pending.extend(_field_types(current))
+        else:
+            pending.extend(getattr(current, "__args__", None) or ())
+    return models
+
+
+_source_hashes: Dict[str, str] = {}
+
+
+def _source_hash(module_name: str) -> str:
+    if module_name not in _source_hashes:
+        digest = ""
+        try:
+            source_file = inspect.getsourcefile(sys.modules[module_name])
+            if source_file:
+                with open(source_file, "rb") as f:
+                    digest = hashlib.sha256(f.read()).hexdigest()
+        except (KeyError, OSError, TypeError):
+            pass
+        _source_hashes[module_name] = digest
+    return _source_hashes[module_name]
+
+
+def _config(model: Type[BaseModel]) -> dict:
+    """
+    A model's configuration, without callables, whose reprs differ between
+    processes.
+    """
+    config = getattr(model, "model_config", None)
+    if config is None:
+        config = {
+            name: getattr(model.__config__, name)
+            for name in dir(model.__config__)
+            if not name.startswith("_")
+        }
+    return {
+        name: value for name, value in sorted(config.items()) if not callable(value)
+    }
+
+
+def _fields(model: Type[BaseModel]) -> str:
+    """
+    The names and settings of a model's fields: their aliases, defaults,
+    descriptions, constraints and so on. Memory addresses are left out of
+    the reprs of callables, as they differ between processes.
+    """
+    if PYDANTIC_V2:
+        fields = model.model_fields
+    else:
+        fields = {name: field.field_info for name, field in model.__fields__.items()}
+    settings = [(name, list(field.__repr_args__())) for name, field in fields.items()]
+    return re.sub(r" at 0x[0-9a-fA-F]+", "", repr(settings))
+
+
+def _fingerprinted_models(model: Type[BaseModel]) -> list:
+    """
+    The model, every model nested within it, and every model they inherit
+    from, as fields and their descriptions may be declared on base classes.
+    """
+    models = {}
+    for nested in _nested_models(model):
+        for base in nested.__mro__:
+            if issubclass(base, BaseModel) and base is not BaseModel:
+                models[base] = None
+    return list(models)
+
+
+def model_fingerprint(model: Type[BaseModel]) -> str:
+    """
+    A fingerprint of everything that may affect a model's schema: the fields
+    and their settings, configuration and module source of the model, of every model nested
+    within it and of every model they inherit from, plus the Pydantic
+    version.
+    """
+    digest = hashlib.sha256()
+    digest.update(DISK_CACHE_VERSION.encode())
+    digest.update(str(pydantic.VERSION).encode())
+    for nested in sorted(
+        _fingerprinted_models(model), key=lambda m: (m.__module__, m.__qualname__)
+    ):
+        digest.update(nested.__module__.encode())
+        digest.update(nested.__qualname__.encode())
+        digest.update(repr(_field_types(nested)).encode())
+        digest.update(_fields(nested).encode())
+        digest.update(repr(_config(nested)).encode())
+        digest.update(_source_hash(nested.__module__).encode())
+    return digest.hexdigest()
+
+
+def _references(schema: Any) -> Set[str]:
+    """
+    The names of all components referenced anywhere within a schema.
+    """
+    names = set()
+    pending = [schema]
+    prefix = REF_TEMPLATE.format(model="")
+    while pending:
+        current = pending.pop()
+        if isinstance(current, dict):
+            ref = current.get("$ref")
+            if isinstance(ref, str) and ref.startswith(prefix):
+                names.add(ref[len(prefix) :])
+            pending.extend(current.values())
+        elif isinstance(current, list):
+            pending.extend(current)
+    return names
+
+
+# The attribute of a model class holding its cached TypeAdapter. It is kept on
+# the class, rather than in a dictionary keyed on the class, because the
+# adapter refers to the model and would keep it alive.
+ADAPTER_ATTRIBUTE = "__chalice_spec_type_adapter__"
+
+
+def type_adapter(model: Type[BaseModel]) -> "TypeAdapter":
+    """
+    Returns a cached Pydantic 2 TypeAdapter for a model, so that the same
+    compiled core schema is used to generate the model's JSON schema and to
+    validate and serialize it at runtime.
+    """
+    # Not getattr, which would find the adapter of a base class.
+    adapter = model.__dict__.get(ADAPTER_ATTRIBUTE)
+    if adapter is None:
+        adapter = TypeAdapter(model)
+        setattr(model, ADAPTER_ATTRIBUTE, adapter)
+    return adapter
+
+
+def model_validator(model: Type[BaseModel]) -> Callable[[Any], BaseModel]:
+    """
+    Returns a callable that validates a JSON-decoded value as an instance of
+    the model, using a cached TypeAdapter on Pydantic 2.
+    """
+    if PYDANTIC_V2:
+        return type_adapter(model).validate_python
+    return model.parse_obj
+
+
+def _generate_schema(model: Type[BaseModel]) -> Tuple[dict, dict]:
+    if PYDANTIC_V2:
+        schema = type_adapter(model).json_schema(ref_template=REF_TEMPLATE)
+        definitions = schema.pop("$defs", {})
+        return schema, definitions
+
+    # Copy, as Pydantic may hand us its own cached schema.
+    schema = deepcopy(model.schema(ref_template=REF_TEMPLATE))
+    definitions = schema.pop("definitions", {})
+    return schema, definitions
+
+
+def _has_clashing_names(models: List[Type[BaseModel]]) -> bool:
+    """
+    Pydantic renames models whose names clash when it generates them
+    together, which would not match the component names we register.
+    """
+    if not PYDANTIC_V2:
+        name_map = get_model_name_map(get_flat_models_from_models(models))
+        return any(name != model.__name__ for model, name in name_map.items())
+
+    nested = set()
+    for model in models:
+        nested.update(_nested_models(model))
+    return len({model.__name__ for model in nested}) != len(nested)
+
+
+def _generate_definitions(models: List[Type[BaseModel]]) -> dict:
+    if PYDANTIC_V2:
+        _, document = TypeAdapter.json_schemas(
+            [(model, "validation", type_adapter(model)) for model in models],
+            ref_template=REF_TEMPLATE,
+        )
+        return document.get("$defs", {})
+    return models_schema(models, ref_template=REF_TEMPLATE)["definitions"]
+
+
+def _generate_schemas(models: List[Type[BaseModel]]) -> List[Tuple[dict, dict]]:
+    """
+    Generates the schemas of many models in one pass, then splits the shared
+    definitions back out into what each model's own schema() would produce.
+    """
+    if len(models) == 1:
+        return [_generate_schema(models[0])]
+
+    if _has_clashing_names(models):
+        return [_generate_schema(model) for model in models]
+
+    definitions = _generate_definitions(models)
+    if any(model.__name__ not in definitions for model in models):
+        return [_generate_schema(model) for model in models]
+
+    results = []
+    for model in models:
+        schema = definitions[model.__name__]
+
+        nested = {}
+        pending = list(_references(schema))
+        while pending:
+            name = pending.pop()
+            if name not in nested and name in definitions:
+                nested[name] = definitions[name]
+                pending.extend(_references(definitions[name]))
+
+        if model.__name__ in nested:
+            # Self-referencing models are laid out differently by schema().
+            results.append(_generate_schema(model))
+        else:
+            results.append(deepcopy((schema, nested)))
+
+    return results
+
+
+class SchemaCache:
+    """
+    Memoizes the JSON schema of Pydantic models, keyed on the model class
+    itself rather than its name, so that each model's schema and nested
+    definitions are only generated once per process.
+
+    Models are held weakly, so dynamically created models may still be
+    garbage collected.
+
+    If a directory is given, schemas are also persisted there (for example,
+    under /tmp, or a directory packaged with your app) so that they survive
+    cold starts. Entries are keyed on a fingerprint of the model's fields and
+    source, so changed models are regenerated, and are written atomically so
+    that concurrent processes never read a partial file. A read-only
+    directory is fine; it will simply never be written to.
+    """
+
+    def __init__(self, directory: Optional[str] = None):
+        self._schemas = weakref.WeakKeyDictionary()
+        self.directory = directory
+        self.hits = 0
+        self.misses = 0
+        self.disk_hits = 0
+
+    def get(self, model: Type[BaseModel]) -> Tuple[dict, dict]:
+        """
+        Returns the schema of a model (without its nested definitions) and its
+        nested definitions. Both are copies, which the caller may modify.
+        """
+        return self.get_many([model])[0]
+
+    def get_many(self, models: List[Type[BaseModel]]) -> List[Tuple[dict, dict]]:
+        """
+        Like get, for several models at once. Models that are not cached yet
+        are generated together in a single pass, so models they share are
+        only walked once.
+        """
+        missing = []
+        for model in dict.fromkeys(models):
+            if model in self._schemas:
+                self.hits += 1
+                continue
+            cached = self._read(self._path(model))
+            if cached is not None:
+                self.disk_hits += 1
+                self._schemas[model] = cached
+            else:
+                missing.append(model)
+
+        if missing:
+            self.misses += len(missing)
+            for model, cached in zip(missing, _generate_schemas(missing)):
+                self._schemas[model] = cached
+                self._write(self._path(model), cached)
+
+        return [deepcopy(self._schemas[model]) for model in models]
+
+    def _path(self, model: Type[BaseModel]) -> Optional[str]:
+        if not self.directory:
+            return None
+        return os.path.join(self.directory, model_fingerprint(model) + ".json")
+
+    @staticmethod
+    def _read(path: Optional[str]) -> Optional[Tuple[dict, dict]]:
+        if not path:
+            return None
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                entry = json.load(f)
+            return entry["schema"], entry["definitions"]
+        except (OSError, ValueError, KeyError, TypeError):
+            return None
+
+    @staticmethod
+    def _write(path: Optional[str], cached: Tuple[dict, dict]) -> None:
+        if not path:
+            return
+        schema, definitions = cached
+        directory = os.path.dirname(path)
+        try:
+            os.makedirs(directory, exist_ok=True)
+            fd, temporary_path = tempfile.mkstemp(dir=directory, suffix=".tmp")
+            try:
+                with os.fdopen(fd, "w", encoding="utf-8") as f:
+                    json.dump({"schema": schema, "definitions": definitions}, f)
+                os.replace(temporary_path, path)
+            except BaseException:
+                os.unlink(temporary_path)
+                raise
+        except (OSError, TypeError, ValueError):
+            # The cache is an optimization; never fail a build because of it.
+            pass
+
+    def forget(self, models: Iterable[Type[BaseModel]]) -> None:
+        """
+        Drops the in-memory schemas of the given models, for example once the
+        spec that needed them has been frozen. Pydantic 1 also keeps a copy
+        of each model's schema, which is dropped too. Files on disk are kept.
+        """
+        for model in models:
+            self._schemas.pop(model, None)
+            if not PYDANTIC_V2:
+                for nested in _nested_models(model):
+                    nested.__schema_cache__.clear()
+
+    def info(self) -> CacheInfo:
+        return CacheInfo(
+            hits=self.hits,
+            misses=self.misses,
+            size=len(self._schemas),
+            disk_hits=self.disk_hits,
+        )
+
+    def clear(self) -> None:
+        """
+        Clears the in-memory cache and counters. Files on disk are kept.
+        """
+        self._schemas.clear()
+        self.hits = 0
+        self.misses = 0
+        self.disk_hits = 0
+
+
+# Shared by every PydanticPlugin in the process, unless one is given its own.
+schema_cache = SchemaCache()
+
 
 class PydanticPlugin(BasePlugin):
     """
@@ -21,27 +427,111 @@ class PydanticPlugin(BasePlugin):
 
         spec = APISPec(plugins=[PydanticPlugin()])
         spec.components.schema("MyModel", model=MyModel)
+
+    Schemas are memoized in chalice_spec.pydantic.schema_cache, whose hit and
+    miss counters are available from schema_cache.info().
+
+    If stats is set, the time spent on each model is recorded there.
+    ChaliceWithSpec records its own builds into its spec_stats with
+    recording().
     """
 
+    def __init__(self, cache: SchemaCache = None, stats: Optional[SpecStats] = None):
+        super(PydanticPlugin, self).__init__()
+        self.cache = cache if cache is not None else schema_cache
+        self.stats = stats
+
+    @contextmanager
+    def recording(self, stats: SpecStats) -> Iterator[None]:
+        """
+        Records into stats within the block, unless the plugin has stats of
+        its own. Apps sharing a plugin each record their builds this way, so
+        one app's models never end up in another app's stats.
+        """
+        if self.stats is not None:
+            yield
+            return
+        self.stats = stats
+        try:
+            yield
+        finally:
+            self.stats = None
+
+    def _record(
+        self,
+        models: List[Type[BaseModel]],
+        seconds: float,
+        generated: int = 0,
+        deduplicated: int = 0,
+    ) -> None:
+        if self.stats is None:
+            return
+        # Models generated together in one batch share its time equally.
+        for model in models:
+            self.stats.model_seconds[model.__name__] = self.stats.model_seconds.get(
+                model.__name__, 0.0
+            ) + seconds / len(models)
+        self.stats.schemas_generated += generated
+        self.stats.schemas_deduplicated += deduplicated
+
     def schema_helper(
         self, name: str, definition: dict, **kwargs: Any
     ) -> Union[dict, None]:
         model: Union[BaseModel, None] = kwargs.pop("model", None)
         if model:
-            schema = model.schema(ref_template="#/components/schemas/{model}")
+            start, misses, skipped = time.perf_counter(), self.cache.misses, 0
+            schema, definitions = self.cache.get(model)
 
             # If the spec has passed, we probably have nested models to contend with.
             spec: Union[APISpec, None] = kwargs.pop("spec", None)
-            if spec and "definitions" in schema:
-                for k, v in schema["definitions"].items():
-                    try:
+            if spec:
+                for k, v in definitions.items():
+                    if k not in spec.components.schemas:
                         spec.components.schema(k, v)
-                    except DuplicateComponentNameError:
-                        pass
-
-            if "definitions" in schema:
-                del schema["definitions"]
+                    else:
+                        skipped += 1
 
+            generated = self.cache.misses - misses
+            self._record(
+                [model], time.perf_counter() - start, generated, 1 - generated + skipped
+            )
             return schema
 
         return None
+
+    def register_models(self, spec: APISpec, models: List[Type[BaseModel]]) -> None:
+        """
+        Registers many models, and every model nested within them, with a spec
+        at once. Schemas that are not cached yet are generated in a single
+        pass, and definitions shared between models are only registered once.
+        Models whose names are already registered are skipped.
+        """
+        unique = list(dict.fromkeys(models))
+        models = [
+            model for model in unique if model.__name__ not in spec.components.schemas
+        ]
+        if not models:
+            self._record([], 0.0, deduplicated=len(unique))
+            return
+
+        start, misses = time.perf_counter(), self.cache.misses
+        entries = self.cache.get_many(models)
+        generated = self.cache.misses - misses
+        self._record(
+            models,
+            time.perf_counter() - start,
+            generated,
+            len(unique) - generated,
+        )
+
+        # Nested definitions first, in the same order schema_helper uses.
+        for model, (schema, definitions) in zip(models, entries):
+            start, skipped = time.perf_counter(), 0
+            for name, definition in definitions.items():
+                if name not in spec.components.schemas:
+                    spec.components.schema(name, definition)
+                else:
+                    skipped += 1
+            if model.__name__ not in spec.components.schemas:
+                spec.components.schema(model.__name__, schema)
+            self._record([model], time.perf_counter() - start, deduplicated=skipped)
@@ -0,0 +1,594 @@
+"""
+Serves a prebuilt spec, and the Swagger UI, using only the standard library
+and Chalice. Production apps that serve a spec exported at build time (see
+`python -m chalice_spec export`) can use spec_blueprint from this module, so
+that apispec, Pydantic and chalice-spec's schema generation are never
+imported.
+"""
+
+import gzip
+import hashlib
+import io
+import json
+import re
+from typing import Dict, List, Optional, Tuple, Union
+
+from chalice import BadRequestError, Blueprint, NotFoundError, Response
+from chalice.app import Request
+
+from chalice_spec.documents import (
+    PROFILES,
+    SpecIndex,
+    minify,
+    serialize_document,
+    slugs,
+    split_by_tag,
+)
+
+try:
+    import brotli
+except ImportError:  # pragma: no cover
+    brotli = None
+
+
+DEFAULT_CACHE_CONTROL = "no-cache"
+
+# Courtesy of Stephan Fitzpatrick (@knowsuchagency)
+SWAGGER_HTML = """
+        <!DOCTYPE html>
+        <html lang="en">
+        <head>
+          <meta charset="utf-8" />
+          <meta name="viewport" content="width=device-width, initial-scale=1" />
+          <meta
+            name="description"
+            content="SwaggerUI"
+          />
+          <title>SwaggerUI</title>
+          <link rel="stylesheet" href="https://unpkg.com/swagger-ui-dist@4.5.0/swagger-ui.css" />
+        </head>
+        <body>
+        <div id="swagger-ui"></div>
+        <script src="https://unpkg.com/swagger-ui-dist@4.5.0/swagger-ui-bundle.js" crossorigin></script>
+        <script>
+          window.onload = () => {
+            window.ui = SwaggerUIBundle({
+              url: './openapi.json?profile=full',
+              dom_id: '#swagger-ui',
+            });
+          };
+        </script>
+        </body>
+        </html>
+    """
+
+# Loads the list of tags first, then only the spec for the selected tag.
+SWAGGER_TAGS_HTML = """
+        <!DOCTYPE html>
+        <html lang="en">
+        <head>
+          <meta charset="utf-8" />
+          <meta name="viewport" content="width=device-width, initial-scale=1" />
+          <meta
+            name="description"
+            content="SwaggerUI"
+          />
+          <title>SwaggerUI</title>
+          <link rel="stylesheet" href="https://unpkg.com/swagger-ui-dist@4.5.0/swagger-ui.css" />
+        </head>
+        <body>
+        <div id="swagger-ui"></div>
+        <script src="https://unpkg.com/swagger-ui-dist@4.5.0/swagger-ui-bundle.js" crossorigin></script>
+        <script src="https://unpkg.com/swagger-ui-dist@4.5.0/swagger-ui-standalone-preset.js" crossorigin></script>
+        <script>
+          window.onload = () => {
+            const index = new URL('./openapi/tags.json', window.location.href);
+            fetch(index)
+              .then((response) => response.json())
+              .then((tags) => {
+                window.ui = SwaggerUIBundle({
+                  urls: tags.map((tag) => {
+                    const url = new URL(tag.url, index);
+                    url.searchParams.set('profile', 'full');
+                    return { name: tag.name, url: url.href };
+                  }),
+                  dom_id: '#swagger-ui',
+                  presets: [SwaggerUIBundle.presets.apis, SwaggerUIStandalonePreset],
+                  layout: 'StandaloneLayout',
+                });
+              });
+          };
+        </script>
+        </body>
+        </html>
+    """
+
+# The name of the list of tags, which no tag's spec may use.
+TAG_INDEX = "tags"
+
+# Query parameters of /openapi.json that select part of the spec; see
+# chalice_spec.documents.SpecIndex.select.
+QUERY_FILTERS = ("paths", "tags", "components")
+
+# The content type of compressed specs. Compressed bodies are binary, and
+# Chalice requires every response with a binary content type to be requested
+# with a matching Accept header; giving compressed specs a content type of
+# their own leaves application/json, and so every other route, as it was.
+COMPRESSED_CONTENT_TYPE = "application/vnd.oai.openapi+json"
+
+# How many query results each served spec keeps serialized.
+MAX_QUERIES = 64
+
+# The query parameter of /openapi.json that picks one of the PROFILES, and the
+# profile served without it. The Swagger UI always asks for the full profile.
+PROFILE_PARAM = "profile"
+DEFAULT_PROFILE = "full"
+
+
+def make_etag(body: str) -> str:
+    """
+    Returns a strong ETag (including the surrounding quotes) for a response body.
+    """
+    return '"' + hashlib.sha256(body.encode("utf-8")).hexdigest()[:32] + '"'
+
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """
+    Whether an If-None-Match header matches the given ETag. Weak comparison
+    is used, as recommended by RFC 9110 for If-None-Match.
+    """
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    for candidate in if_none_match.split(","):
+        candidate = candidate.strip()
+        if candidate.startswith("W/"):
+            candidate = candidate[2:]
+        if candidate == etag:
+            return True
+    return False
+
+
+def conditional_response(
+    request: Request,
+    body: Union[str, bytes],
+    etag: str,
+    content_type: str,
+    cache_control: Optional[str],
+    headers: Optional[Dict[str, str]] = None,
+) -> Response:
+    """
+    Returns a response for the body, or a bodyless 304 Not Modified if the
+    client already holds the current representation.
+    """
+    headers = dict(headers or {}, ETag=etag)
+    if cache_control:
+        headers["Cache-Control"] = cache_control
+
+    if etag_matches(request.headers.get("if-none-match"), etag):
+        return Response(body="", status_code=304, headers=headers)
+
+    headers["Content-Type"] = content_type
+    return Response(body=body, status_code=200, headers=headers)
+
+
+def _gzip(data: bytes) -> bytes:
+    buffer = io.BytesIO()
+    # A fixed mtime keeps the output, and therefore its ETag, reproducible.
+    with gzip.GzipFile(fileobj=buffer, mode="wb", mtime=0) as compressed:
+        compressed.write(data)
+    return buffer.getvalue()
+
+
+# In order of preference, when the client accepts several equally.
+COMPRESSORS = {}
+if brotli is not None:
+    COMPRESSORS["br"] = brotli.compress
+COMPRESSORS["gzip"] = _gzip
+
+
+def negotiate_encoding(
+    accept_encoding: Optional[str], encodings: List[str]
+) -> Optional[str]:
+    """
+    Picks the best of the available content encodings for an Accept-Encoding
+    header, or None if the response should not be compressed.
+    """
+    if not accept_encoding:
+        return None
+
+    qualities = {}
+    for item in accept_encoding.split(","):
+        name, _, params = item.partition(";")
+        name = name.strip().lower()
+        if not name:
+            continue
+        quality = 1.0
+        params = params.strip()
+        if params.startswith("q="):
+            try:
+                quality = float(params[2:])
+            except ValueError:
+                quality = 0.0
+        qualities[name] = quality
+
+    best, best_quality = None, qualities.get("identity", 0.0)
+    for encoding in encodings:
+        quality = qualities.get(encoding, qualities.get("*", 0.0))
+        # Prefer compression unless identity was explicitly ranked higher.
+        if quality > 0 and (
+            quality > best_quality or (best is None and quality == best_quality)
+        ):
+            best, best_quality = encoding, quality
+    return best
+
+
+def _content_type_matches(header: Optional[str], content_types: List[str]) -> bool:
+    # Mirrors how Chalice decides whether a body should be treated as binary.
+    if not header:
+        return False
+    content_types = [content_type.lower() for content_type in content_types]
+    parts = [part.strip() for part in re.split("[,;]", header.lower())]
+    return (
+        "*/*" in parts
+        or "*/*" in content_types
+        or bool(set(parts) & set(content_types))
+    )
+
+
+def can_send_binary(request: Request, binary_types: List[str]) -> bool:
+    """
+    Whether Chalice will return a binary (compressed) spec for this request.
+    The app must list COMPRESSED_CONTENT_TYPE in its binary types, and the
+    request must accept a binary type; otherwise Chalice would reject the
+    response with a 400.
+    """
+    return _content_type_matches(
+        COMPRESSED_CONTENT_TYPE, binary_types
+    ) and _content_type_matches(request.headers.get("accept"), binary_types)
+
+
+class SpecBlueprint(Blueprint):
+    """
+    A Blueprint which adds binary_types to the binary types of each app it
+    is registered with, so that compressed specs can be served without
+    configuring the app.
+    """
+
+    def __init__(self, import_name: str, binary_types: List[str] = None):
+        super().__init__(import_name)
+        self._binary_types = list(binary_types or [])
+
+    def register(self, app, options) -> None:
+        for binary_type in self._binary_types:
+            if binary_type not in app.api.binary_types:
+                app.api.binary_types.append(binary_type)
+        super().register(app, options)
+
+
+class ServedSpec:
+    """
+    A serialized spec as it is served: its body, ETag, and compressed
+    variants. Subclasses fill in _body and _etag in _refresh(), which is
+    called before each use.
+    """
+
+    def __init__(self):
+        self._body: Optional[str] = None
+        self._etag: Optional[str] = None
+        self._encoded: Dict[str, bytes] = {}
+        self._tags: Optional[Dict[str, Tuple[str, "StaticSpec"]]] = None
+        self._tag_index: Optional["StaticSpec"] = None
+        self._index: Optional[SpecIndex] = None
+        self._queries: Dict[tuple, "StaticSpec"] = {}
+        self._profiles: Dict[str, "StaticSpec"] = {}
+
+    def _refresh(self) -> None:
+        raise NotImplementedError
+
+    def _changed(self) -> None:
+        """
+        Forgets everything derived from the previous body.
+        """
+        self._encoded = {}
+        self._tags = None
+        self._tag_index = None
+        self._index = None
+        self._queries = {}
+        self._profiles = {}
+
+    def _document(self) -> dict:
+        return json.loads(self._bytes())
+
+    def _bytes(self) -> bytes:
+        return self._body.encode("utf-8")
+
+    @property
+    def body(self) -> str:
+        self._refresh()
+        return self._body
+
+    @property
+    def etag(self) -> str:
+        self._refresh()
+        return self._etag
+
+    def encoded(self, encoding: str) -> bytes:
+        """
+        The serialized spec compressed with one of COMPRESSORS. Each variant
+        is compressed once per revision of the spec.
+        """
+        self._refresh()
+        if encoding not in self._encoded:
+            self._encoded[encoding] = COMPRESSORS[encoding](self._bytes())
+        return self._encoded[encoding]
+
+    def encoded_etag(self, encoding: str) -> str:
+        self._refresh()
+        return self._etag[:-1] + "-" + encoding + '"'
+
+    def by_tag(self) -> Dict[str, Tuple[str, "StaticSpec"]]:
+        """
+        The spec split by tag (see chalice_spec.documents.split_by_tag), as
+        (tag, spec) pairs keyed by a URL-safe slug of the tag. The spec is
+        split once per revision.
+        """
+        self._refresh()
+        if self._tags is None:
+            documents = split_by_tag(self._document())
+            names = slugs(list(documents), reserved=[TAG_INDEX])
+            self._tags = {
+                names[tag]: (tag, StaticSpec(serialize_document(document)))
+                for tag, document in documents.items()
+            }
+            self._tag_index = StaticSpec(
+                serialize_document(
+                    [
+                        {"name": tag, "url": f"{slug}.json"}
+                        for slug, (tag, _) in self._tags.items()
+                    ]
+                )
+            )
+        return self._tags
+
+    def tag_index(self) -> "StaticSpec":
+        """
+        The list of tags, each with the URL of its spec relative to the
+        list's own URL.
+        """
+        self.by_tag()
+        return self._tag_index
+
+    def index(self) -> SpecIndex:
+        """
+        An index over the spec, built once per revision.
+        """
+        self._refresh()
+        if self._index is None:
+            self._index = SpecIndex(self._document())
+        return self._index
+
+    def query(
+        self,
+        paths: Optional[List[str]] = None,
+        tags: Optional[List[str]] = None,
+        components: Optional[List[str]] = None,
+    ) -> "StaticSpec":
+        """
+        The part of the spec selected by SpecIndex.query. The MAX_QUERIES most
+        recently used results are kept serialized.
+        """
+        index = self.index()
+        key = tuple(
+            None if values is None else tuple(values)
+            for values in (paths, tags, components)
+        )
+        # Reinserted on every hit, so the first key is the least recently used.
+        served = self._queries.pop(key, None)
+        if served is None:
+            if len(self._queries) >= MAX_QUERIES:
+                del self._queries[next(iter(self._queries))]
+            served = StaticSpec(
+                serialize_document(index.query(paths, tags, components))
+            )
+        self._queries[key] = served
+        return served
+
+    def profile(self, name: str) -> "ServedSpec":
+        """
+        The spec as served in one of the PROFILES: the spec itself for the
+        full profile, and otherwise a minified copy (see
+        chalice_spec.documents.minify), made once per revision.
+        """
+        strip = PROFILES[name]
+        if strip is None:
+            return self
+        self._refresh()
+        if name not in self._profiles:
+            self._profiles[name] = StaticSpec(
+                serialize_document(minify(self._document(), strip))
+            )
+        return self._profiles[name]
+
+
+class StaticSpec(ServedSpec):
+    """
+    A serialized spec, or part of one, that never changes.
+    """
+
+    def __init__(self, body: str):
+        super().__init__()
+        self._body = body
+        self._etag = make_etag(body)
+
+    def _refresh(self) -> None:
+        pass
+
+
+class PackagedSpec(ServedSpec):
+    """
+    Serves a spec that was exported ahead of time (see
+    `python -m chalice_spec export`), so that no schemas are generated at
+    runtime. The file is read once, on first use, and served as-is.
+    """
+
+    def __init__(self, path: str):
+        super().__init__()
+        self._path = path
+
+    def _refresh(self) -> None:
+        if self._body is None:
+            with open(self._path, "rb") as spec_file:
+                self._body = spec_file.read().decode("utf-8")
+            self._etag = make_etag(self._body)
+
+
+def query_filters(request: Request) -> Dict[str, List[str]]:
+    """
+    The QUERY_FILTERS given as query parameters. Each may be repeated, or
+    list several comma-separated values.
+    """
+    params = request.query_params or {}
+    return {
+        name: [
+            value
+            for param in params.getlist(name)
+            for value in param.split(",")
+            if value
+        ]
+        for name in QUERY_FILTERS
+        if name in params
+    }
+
+
+def add_spec_routes(
+    blueprint: Blueprint,
+    serialized: ServedSpec,
+    enable_swagger: bool = False,
+    cache_control: Optional[str] = DEFAULT_CACHE_CONTROL,
+    compress: bool = False,
+    split_tags: bool = False,
+    profile: str = DEFAULT_PROFILE,
+) -> None:
+    """
+    Adds the /openapi.json route serving a spec (or, given any of the
+    QUERY_FILTERS, part of it), and optionally the /docs Swagger UI and the
+    /openapi/{tag}.json routes, to a blueprint. See chalice_spec_blueprint
+    for the options.
+
+    With compress=True, compressed specs are only served once the app lists
+    COMPRESSED_CONTENT_TYPE in its binary types, which a SpecBlueprint does
+    when it is registered.
+    """
+    if profile not in PROFILES:
+        raise TypeError(f"profile must be one of {', '.join(PROFILES)}")
+
+    def in_profile(served: ServedSpec) -> ServedSpec:
+        params = blueprint.current_request.query_params or {}
+        name = params.get(PROFILE_PARAM, profile)
+        if name not in PROFILES:
+            raise BadRequestError(
+                f"{PROFILE_PARAM} must be one of {', '.join(PROFILES)}"
+            )
+        return served.profile(name)
+
+    def respond(served: ServedSpec) -> Response:
+        request = blueprint.current_request
+        if not compress:
+            return conditional_response(
+                request,
+                served.body,
+                served.etag,
+                "application/json",
+                cache_control,
+            )
+
+        encoding = None
+        if can_send_binary(request, blueprint.current_app.api.binary_types):
+            encoding = negotiate_encoding(
+                request.headers.get("accept-encoding"), list(COMPRESSORS)
+            )
+
+        # Whether the body is compressed depends on Accept, too.
+        headers = {"Vary": "Accept, Accept-Encoding"}
+        if encoding is None:
+            return conditional_response(
+                request,
+                served.body,
+                served.etag,
+                "application/json",
+                cache_control,
+                headers,
+            )
+
+        headers["Content-Encoding"] = encoding
+        return conditional_response(
+            request,
+            served.encoded(encoding),
+            served.encoded_etag(encoding),
+            COMPRESSED_CONTENT_TYPE,
+            cache_control,
+            headers,
+        )
+
+    @blueprint.route("/openapi.json")
+    def openapi_json():
+        filters = query_filters(blueprint.current_request)
+        if filters:
+            return respond(in_profile(serialized.query(**filters)))
+        return respond(in_profile(serialized))
+
+    if split_tags:
+        # API Gateway path parameters must be whole segments, so the .json
+        # extension is part of the parameter.
+        @blueprint.route("/openapi/{name}")
+        def openapi_tag(name):
+            slug, _, extension = name.rpartition(".")
+            if extension == "json" and slug == TAG_INDEX:
+                return respond(serialized.tag_index())
+            tags = serialized.by_tag()
+            if extension != "json" or slug not in tags:
+                raise NotFoundError(f"No spec for {name}")
+            return respond(in_profile(tags[slug][1]))
+
+    if enable_swagger:
+        swagger_html = SWAGGER_TAGS_HTML if split_tags else SWAGGER_HTML
+        swagger_etag = make_etag(swagger_html)
+
+        @blueprint.route("/docs")
+        def docs():
+            return conditional_response(
+                blueprint.current_request,
+                swagger_html,
+                swagger_etag,
+                "text/html",
+                cache_control,
+            )
+
+
+def spec_blueprint(
+    spec_file: str,
+    enable_swagger: bool = False,
+    cache_control: Optional[str] = DEFAULT_CACHE_CONTROL,
+    compress: bool = False,
+    split_tags: bool = False,
+    profile: str = DEFAULT_PROFILE,
+) -> Blueprint:
+    """
+    Returns a Blueprint which serves a spec exported at build time, and
+    (optionally) a Swagger UI and per-tag specs. It behaves like
+    chalice_spec.blueprint.chalice_spec_blueprint(spec_file=spec_file), but
+    does not need apispec or Pydantic.
+    """
+    blueprint = SpecBlueprint(__name__, [COMPRESSED_CONTENT_TYPE] if compress else [])
+    add_spec_routes(
+        blueprint,
+        PackagedSpec(spec_file),
+        enable_swagger,
+        cache_control,
+        compress,
+        split_tags,
+        profile,
+    )
+    return blueprint
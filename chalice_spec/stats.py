@@ -0,0 +1,87 @@
+import time
+from contextlib import contextmanager
+from typing import Dict, Iterator
+
+PHASES = [
+    "register_models",
+    "compile_fragments",
+    "build_operations",
+    "trim_docstring",
+    "spec_path",
+]
+
+
+class SpecStats:
+    """
+    Records where time goes while a spec is built, so that a regression in
+    cold starts can be traced to chalice-spec, and to the route or model
+    responsible.
+
+    All times are in seconds. Route times include everything done in
+    ChaliceWithSpec.decorate for that path, model times include generating
+    (or fetching from cache) and registering the model's schema.
+    """
+
+    def __init__(self):
+        self.route_seconds: Dict[str, float] = {}
+        self.model_seconds: Dict[str, float] = {}
+        self.phase_seconds: Dict[str, float] = dict.fromkeys(PHASES, 0.0)
+        self.schemas_generated = 0
+        self.schemas_deduplicated = 0
+
+    @contextmanager
+    def timed(self, table: Dict[str, float], key: str) -> Iterator[None]:
+        """
+        Adds the time spent in the block to table[key].
+        """
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            table[key] = table.get(key, 0.0) + time.perf_counter() - start
+
+    @property
+    def total_seconds(self) -> float:
+        return (
+            self.phase_seconds["register_models"]
+            + self.phase_seconds["compile_fragments"]
+            + sum(self.route_seconds.values())
+        )
+
+    def to_dict(self) -> dict:
+        return {
+            "total_seconds": self.total_seconds,
+            "phase_seconds": dict(self.phase_seconds),
+            "route_seconds": dict(self.route_seconds),
+            "model_seconds": dict(self.model_seconds),
+            "schemas_generated": self.schemas_generated,
+            "schemas_deduplicated": self.schemas_deduplicated,
+        }
+
+    def report(self, top: int = 10) -> str:
+        """
+        A human-readable summary, listing the `top` slowest routes and models.
+        """
+        lines = [
+            f"Spec build: {len(self.route_seconds)} paths, "
+            f"{self.total_seconds * 1000:.2f} ms",
+        ]
+        for phase in PHASES:
+            lines.append(f"  {phase:<18} {self.phase_seconds[phase] * 1000:9.2f} ms")
+        lines.append(
+            f"Schemas: {self.schemas_generated} generated, "
+            f"{self.schemas_deduplicated} deduplicated"
+        )
+
+        for title, table in (
+            ("routes", self.route_seconds),
+            ("models", self.model_seconds),
+        ):
+            if not table:
+                continue
+            lines.append(f"Slowest {title}:")
+            slowest = sorted(table.items(), key=lambda item: item[1], reverse=True)
+            for name, seconds in slowest[:top]:
+                lines.append(f"  {seconds * 1000:9.2f} ms  {name}")
+
+        return "\n".join(lines)
@@ -0,0 +1,133 @@
+import functools
+import json
+import logging
+import random
+from typing import Any, Callable, Dict, NamedTuple
+
+from chalice import Response
+from chalice.app import Chalice
+from pydantic import ValidationError
+
+from chalice_spec.docs import DEFAULT_CODE, DEFAULT_CONTENT_TYPE
+
+logger = logging.getLogger(__name__)
+
+
+def validate_request_body(
+    app: Chalice, func: Callable[..., Any], validators: Dict[str, Callable]
+) -> Callable[..., Any]:
+    """
+    Wraps a view function so that the request body is validated before the
+    view is called. The validated body is available to the view as
+    app.current_request.validated_body, and invalid bodies are answered with
+    a 400 Bad Request listing the validation errors.
+
+    validators maps lower-case methods to callables that parse a JSON body,
+    such as chalice_spec.pydantic.model_validator(model). Methods without one
+    are not validated, and their validated_body is None.
+    """
+
+    @functools.wraps(func)
+    def view(*args, **kwargs):
+        request = app.current_request
+        validator = validators.get(request.method.lower())
+        request.validated_body = None
+        if validator:
+            try:
+                request.validated_body = validator(request.json_body)
+            except ValidationError as e:
+                return Response(
+                    body={
+                        "Code": "BadRequestError",
+                        "Message": "The request body is invalid.",
+                        "Errors": json.loads(e.json()),
+                    },
+                    status_code=400,
+                )
+        return func(*args, **kwargs)
+
+    return view
+
+
+class ResponseCheck(NamedTuple):
+    """
+    How often to validate the responses of one operation, and the validator
+    for each documented status code and content type.
+    """
+
+    rate: float
+    validators: Dict[int, Dict[str, Callable]]
+
+
+def response_violations(check: ResponseCheck, response: Any) -> list:
+    """
+    Compares a view's return value with the documented responses, and
+    returns a description of every way in which it does not match.
+    """
+    if isinstance(response, Response):
+        status_code, body = response.status_code, response.body
+        content_type = DEFAULT_CONTENT_TYPE
+        for name, value in response.headers.items():
+            if name.lower() == "content-type":
+                content_type = value.split(";", 1)[0].strip()
+    else:
+        status_code, body, content_type = DEFAULT_CODE, response, DEFAULT_CONTENT_TYPE
+
+    by_content_type = check.validators.get(status_code)
+    if by_content_type is None:
+        return [f"status code {status_code} is not documented"]
+
+    validator = by_content_type.get(content_type)
+    if validator is None:
+        return [
+            f"content type {content_type} is not documented for status {status_code}"
+        ]
+
+    if isinstance(body, (str, bytes)) and content_type.endswith("json"):
+        try:
+            body = json.loads(body)
+        except ValueError:
+            return [f"body of status {status_code} is not valid JSON"]
+
+    try:
+        validator(body)
+    except ValidationError as e:
+        return [f"body of status {status_code} does not match its model: {e}"]
+
+    return []
+
+
+def sample_response_validation(
+    app: Chalice, func: Callable[..., Any], checks: Dict[str, ResponseCheck]
+) -> Callable[..., Any]:
+    """
+    Wraps a view function so that a sample of its responses are validated
+    against the documented responses, and any violations are logged as
+    warnings on the chalice_spec.validation logger. (Chalice apps only log
+    errors unless in debug mode, so app.log is not used.) Responses are
+    always returned unchanged.
+
+    checks maps lower-case methods to a ResponseCheck. Requests that are not
+    sampled only pay for a dictionary lookup and a random number.
+    """
+
+    @functools.wraps(func)
+    def view(*args, **kwargs):
+        response = func(*args, **kwargs)
+
+        request = app.current_request
+        check = checks.get(request.method.lower())
+        if check is None or random.random() >= check.rate:
+            return response
+
+        for violation in response_violations(check, response):
+            logger.warning(
+                "Response to %s %s violates the spec: %s",
+                request.method,
+                request.context.get("resourcePath", ""),
+                violation,
+            )
+
+        return response
+
+    return view
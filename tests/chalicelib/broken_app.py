@@ -0,0 +1 @@
+from tests.schema import MissingSchema  # noqa: F401
@@ -0,0 +1,21 @@
+from apispec import APISpec
+
+from chalice_spec import ChaliceWithSpec, Docs, PydanticPlugin
+from tests.schema import AnotherSchema
+
+spec = APISpec(
+    title="Frozen Schema",
+    openapi_version="3.0.1",
+    version="0.0.0",
+    plugins=[PydanticPlugin()],
+)
+app = ChaliceWithSpec(app_name="frozen", spec=spec)
+
+
+@app.route("/", docs=Docs(get=AnotherSchema))
+def index():
+    """Get another schema."""
+    pass
+
+
+app.freeze_spec()
@@ -0,0 +1,18 @@
+from apispec import APISpec
+
+from chalice_spec import ChaliceWithSpec, Docs, PydanticPlugin
+from tests.schema import TestSchema
+
+spec = APISpec(
+    title="Test Schema",
+    openapi_version="3.0.1",
+    version="0.0.0",
+    plugins=[PydanticPlugin()],
+)
+app = ChaliceWithSpec(app_name="test", spec=spec, lazy_spec=True)
+
+
+@app.route("/", docs=Docs(get=TestSchema))
+def index():
+    """Get the test schema."""
+    pass
@@ -0,0 +1,27 @@
+from benchmarks import imports
+from benchmarks.run import format_table, measure
+
+
+def test_measure():
+    result = measure(routes=6, models=3, depth=1, blueprints=2, requests=2)
+
+    assert result["routes"] == 6
+    assert result["spec_bytes"] > 0
+    assert result["import_peak_kib"] > 0
+    assert result["request_median_ms"] > 0
+    assert format_table([result]).splitlines()[1].split()[0] == "6"
+
+
+def test_measure_lazy():
+    eager = measure(routes=4, models=2, depth=2, blueprints=0, requests=1)
+    lazy = measure(routes=4, models=2, depth=2, blueprints=0, lazy=True, requests=1)
+
+    assert lazy["spec_bytes"] == eager["spec_bytes"]
+
+
+def test_measure_imports():
+    result = imports.measure("chalice_spec.runtime", repeat=1)
+
+    assert result["import_ms"] > 0
+    assert result["modules"] > 0
+    assert "chalice_spec.runtime" in imports.format_table([result])
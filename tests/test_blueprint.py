@@ -229,3 +229,114 @@ def test_two_blueprints():
             }
         },
     }
+
+
+def test_blueprint_compiled_once(monkeypatch):
+    from chalice_spec import Docs
+    from chalice_spec.chalice import BlueprintWithSpec
+    from chalice_spec.fragments import SpecFragment
+    from .schema import AnotherSchema, TestSchema
+
+    blueprint = BlueprintWithSpec(__name__)
+
+    @blueprint.route("/things/{id}", methods=["GET", "POST"], docs=Docs(get=TestSchema))
+    def things(id):
+        """Things."""
+        pass
+
+    compiled = []
+    compile_fragment = SpecFragment.compile.__func__
+
+    def counting_compile(cls, *args, **kwargs):
+        compiled.append(args)
+        return compile_fragment(cls, *args, **kwargs)
+
+    monkeypatch.setattr(SpecFragment, "compile", classmethod(counting_compile))
+
+    app, spec = setup_test()
+    app.register_blueprint(blueprint, url_prefix="/a")
+    other_app, other_spec = setup_test()
+    other_app.register_blueprint(blueprint, url_prefix="/b")
+    other_app.register_blueprint(blueprint, url_prefix="/c", name_prefix="c")
+
+    assert len(compiled) == 1
+    assert list(spec.to_dict()["paths"]) == ["/a/things/{id}"]
+    assert list(other_spec.to_dict()["paths"]) == ["/b/things/{id}", "/c/things/{id}"]
+
+    operation = other_spec.to_dict()["paths"]["/c/things/{id}"]
+    assert operation["parameters"] == [
+        {"in": "path", "name": "id", "schema": {"type": "string"}, "required": True}
+    ]
+    assert operation["get"]["tags"] == ["/c"]
+    assert operation["get"]["summary"] == "Things."
+    assert operation["get"]["responses"]["200"]["content"]["application/json"] == {
+        "schema": {"$ref": "#/components/schemas/TestSchema"}
+    }
+    assert list(other_spec.to_dict()["components"]["schemas"]) == ["TestSchema"]
+
+    # Specs must not share the fragment's objects.
+    schema = spec.components.schemas["TestSchema"]
+    assert schema == other_spec.components.schemas["TestSchema"]
+    assert schema is not other_spec.components.schemas["TestSchema"]
+    get = spec._paths["/a/things/{id}"]["get"]
+    assert (
+        get["responses"] is not other_spec._paths["/b/things/{id}"]["get"]["responses"]
+    )
+
+    # Routes added later are compiled again for the next registration.
+    @blueprint.route("/others", docs=Docs(get=AnotherSchema))
+    def others():
+        pass
+
+    late_app, late_spec = setup_test()
+    late_app.register_blueprint(blueprint)
+
+    assert len(compiled) == 2
+    assert list(late_spec.to_dict()["paths"]) == ["/things/{id}", "/others"]
+    assert set(late_spec.to_dict()["components"]["schemas"]) == {
+        "TestSchema",
+        "AnotherSchema",
+    }
+
+
+def test_blueprint_default_responses():
+    from chalice_spec import Docs, Resp
+    from chalice_spec.chalice import BlueprintWithSpec
+    from .schema import AnotherSchema, TestSchema
+
+    blueprint = BlueprintWithSpec(
+        __name__,
+        default_responses=[Resp(AnotherSchema, code=404, description="Not found")],
+    )
+
+    @blueprint.route("/things", docs=Docs(get=TestSchema))
+    def things():
+        pass
+
+    spec = APISpec(
+        title="Test Schema",
+        openapi_version="3.0.1",
+        version="0.0.0",
+        plugins=[PydanticPlugin()],
+    )
+    app = ChaliceWithSpec(
+        app_name="test",
+        spec=spec,
+        default_responses=[
+            Resp(AnotherSchema, code=404, description="Missing"),
+            Resp(AnotherSchema, code=500, description="Error"),
+        ],
+    )
+    app.register_blueprint(blueprint, url_prefix="/a")
+
+    responses = spec.to_dict()["paths"]["/a/things"]["get"]["responses"]
+    assert responses["404"] == {"$ref": "#/components/responses/AnotherSchema404_2"}
+    assert responses["500"] == {"$ref": "#/components/responses/AnotherSchema500"}
+    assert spec.to_dict()["components"]["responses"]["AnotherSchema404_2"] == {
+        "description": "Not found",
+        "content": {
+            "application/json": {
+                "schema": {"$ref": "#/components/schemas/AnotherSchema"}
+            }
+        },
+    }
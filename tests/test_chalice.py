@@ -1,20 +1,22 @@
+import json
+
 import pytest
 from apispec import APISpec
 
 from chalice_spec.chalice import ChaliceWithSpec
 from chalice_spec.docs import Docs, Resp, Op
-from chalice_spec.pydantic import PydanticPlugin
+from chalice_spec.pydantic import PydanticPlugin, SchemaCache
 from tests.schema import TestSchema, AnotherSchema
 
 
-def setup_test():
+def setup_test(**kwargs):
     spec = APISpec(
         title="Test Schema",
         openapi_version="3.0.1",
         version="0.0.0",
         plugins=[PydanticPlugin()],
     )
-    app = ChaliceWithSpec(app_name="test", spec=spec)
+    app = ChaliceWithSpec(app_name="test", spec=spec, **kwargs)
     return app, spec
 
 
@@ -645,3 +647,635 @@ def test_security():
             "securitySchemes": {"BearerAuth": {"type": "http", "scheme": "bearer"}},
         },
     }
+
+
+# Test 11: test that lazy specs are only built on demand
+def test_lazy_spec():
+    app, spec = setup_test(lazy_spec=True)
+
+    @app.route("/", methods=["GET"], docs=Docs(get=TestSchema))
+    def test():
+        """Get the test schema."""
+        pass
+
+    assert spec.to_dict()["paths"] == {}
+    assert "TestSchema" not in spec.to_dict().get("components", {}).get("schemas", {})
+
+    assert app.build_spec() is spec
+    assert spec.to_dict()["paths"] == {
+        "/": {
+            "get": {
+                "summary": "Get the test schema.",
+                "tags": ["/"],
+                "responses": {
+                    "200": {
+                        "description": "Success",
+                        "content": {
+                            "application/json": {
+                                "schema": {"$ref": "#/components/schemas/TestSchema"}
+                            }
+                        },
+                    }
+                },
+            }
+        }
+    }
+
+    @app.route("/another", methods=["POST"], docs=Docs(post=AnotherSchema))
+    def another():
+        pass
+
+    assert "/another" not in spec.to_dict()["paths"]
+    app.build_spec()
+    assert "/another" in spec.to_dict()["paths"]
+    assert list(spec.to_dict()["paths"]) == ["/", "/another"]
+
+
+# Test 12: test that building a lazy spec in one batch matches building it eagerly
+def test_lazy_spec_matches_eager_spec():
+    def document(app):
+        @app.route("/", methods=["GET"], docs=Docs(get=TestSchema))
+        def test():
+            pass
+
+        @app.route(
+            "/another",
+            methods=["POST", "PUT"],
+            docs=Docs(
+                post=Op(request=AnotherSchema, response=TestSchema),
+                put=Op(request=TestSchema, response=AnotherSchema),
+            ),
+        )
+        def another():
+            pass
+
+        @app.route("/undocumented", methods=["POST"])
+        def undocumented():
+            pass
+
+    eager_app, eager_spec = setup_test(generate_default_docs=True)
+    document(eager_app)
+
+    lazy_app, lazy_spec = setup_test(generate_default_docs=True, lazy_spec=True)
+    document(lazy_app)
+    lazy_app.build_spec()
+
+    assert lazy_spec.to_dict() == eager_spec.to_dict()
+    assert set(lazy_spec.to_dict()["components"]["schemas"]) == {
+        "TestSchema",
+        "AnotherSchema",
+        "BaseModel",
+    }
+
+
+# Test 13: test that spec build statistics are recorded
+def test_spec_stats():
+    spec = APISpec(
+        title="Test Schema",
+        openapi_version="3.0.1",
+        version="0.0.0",
+        plugins=[PydanticPlugin(cache=SchemaCache())],
+    )
+    app = ChaliceWithSpec(app_name="test", spec=spec)
+
+    @app.route("/", methods=["GET"], docs=Docs(get=TestSchema))
+    def test():
+        """Get the test schema."""
+        pass
+
+    @app.route(
+        "/another",
+        methods=["POST"],
+        docs=Docs(post=Op(request=AnotherSchema, response=TestSchema)),
+    )
+    def another():
+        pass
+
+    stats = app.spec_stats
+    assert set(stats.route_seconds) == {"/", "/another"}
+    assert set(stats.model_seconds) == {"TestSchema", "AnotherSchema"}
+    assert stats.schemas_generated == 2
+    assert stats.phase_seconds["build_operations"] > 0
+    assert stats.phase_seconds["spec_path"] > 0
+    assert stats.total_seconds >= stats.route_seconds["/"]
+    assert "Schemas: 2 generated" in stats.report()
+
+
+# Test 14: test that request bodies are validated against the documented model
+def test_request_validation():
+    from chalice.test import Client
+
+    app, spec = setup_test(validate_requests=True)
+
+    @app.route(
+        "/validated",
+        methods=["POST", "GET"],
+        docs=Docs(post=Op(request=TestSchema, response=AnotherSchema)),
+    )
+    def validated():
+        body = app.current_request.validated_body
+        if body is None:
+            return {"method": app.current_request.method}
+        return {"hello": body.hello, "type": type(body).__name__}
+
+    @app.route(
+        "/unvalidated",
+        methods=["POST"],
+        docs=Docs(post=Op(request=TestSchema, response=AnotherSchema)),
+        validate_request=False,
+    )
+    def unvalidated():
+        return app.current_request.json_body
+
+    with Client(app) as client:
+        headers = {"Content-Type": "application/json"}
+        response = client.http.post(
+            "/validated", headers=headers, body='{"hello": "there", "world": 1}'
+        )
+        assert response.status_code == 200
+        assert response.json_body == {"hello": "there", "type": "TestSchema"}
+
+        response = client.http.post(
+            "/validated", headers=headers, body='{"hello": "there"}'
+        )
+        assert response.status_code == 400
+        assert response.json_body["Code"] == "BadRequestError"
+        assert response.json_body["Errors"][0]["loc"] == ["world"]
+
+        response = client.http.get("/validated")
+        assert response.json_body == {"method": "GET"}
+
+        response = client.http.post("/unvalidated", headers=headers, body="{}")
+        assert response.status_code == 200
+        assert response.json_body == {}
+
+
+# Test 15: test that operations for shared docs are only built once
+def test_shared_docs(monkeypatch):
+    app, spec = setup_test()
+    docs = Docs(
+        get=TestSchema,
+        post=Op(request=AnotherSchema, response=TestSchema),
+    )
+
+    calls = []
+    build_operations = Docs._build_operations
+
+    def counting_build_operations(self, spec, methods, content_types=None):
+        calls.append(methods)
+        return build_operations(self, spec, methods, content_types)
+
+    monkeypatch.setattr(Docs, "_build_operations", counting_build_operations)
+
+    @app.route("/users/{id}", methods=["GET", "POST"], docs=docs)
+    def users(id):
+        """Users."""
+        pass
+
+    @app.route("/teams/{id}", methods=["GET", "POST"], docs=docs)
+    def teams(id):
+        """Teams."""
+        pass
+
+    assert len(calls) == 1
+
+    paths = spec.to_dict()["paths"]
+    assert paths["/users/{id}"]["get"]["tags"] == ["/users"]
+    assert paths["/users/{id}"]["get"]["summary"] == "Users."
+    assert paths["/teams/{id}"]["get"]["tags"] == ["/teams"]
+    assert paths["/teams/{id}"]["get"]["summary"] == "Teams."
+    assert (
+        paths["/users/{id}"]["post"]["requestBody"]
+        == paths["/teams/{id}"]["post"]["requestBody"]
+    )
+
+    # A different spec gets its own operations, and its own schemas.
+    other_app, other_spec = setup_test()
+
+    @other_app.route("/users/{id}", methods=["GET", "POST"], docs=docs)
+    def other_users(id):
+        pass
+
+    assert len(calls) == 2
+    assert set(other_spec.to_dict()["components"]["schemas"]) == {
+        "TestSchema",
+        "AnotherSchema",
+    }
+
+
+# Test 16: test that docs are immutable, and equal docs share operations
+def test_frozen_docs(monkeypatch):
+    app, spec = setup_test()
+
+    def make_docs():
+        return Docs(
+            get=Op(tags=["users"], response=Resp(TestSchema, description="A user")),
+            post=Op(request=AnotherSchema, response=TestSchema),
+        )
+
+    docs = make_docs()
+    assert docs == make_docs()
+    assert hash(docs) == hash(make_docs())
+    assert docs != Docs(get=TestSchema)
+    assert not hasattr(docs, "__dict__")
+
+    with pytest.raises(AttributeError):
+        docs.get = TestSchema
+    with pytest.raises(AttributeError):
+        docs.post.request = None
+    with pytest.raises(TypeError):
+        docs.get.responses[200] = {}
+
+    calls = []
+    build_operations = Docs._build_operations
+
+    def counting_build_operations(self, spec, methods, content_types=None):
+        calls.append(methods)
+        return build_operations(self, spec, methods, content_types)
+
+    monkeypatch.setattr(Docs, "_build_operations", counting_build_operations)
+
+    @app.route("/users/{id}", methods=["GET", "POST"], docs=make_docs())
+    def users(id):
+        pass
+
+    @app.route("/teams/{id}", methods=["GET", "POST"], docs=make_docs())
+    def teams(id):
+        pass
+
+    assert len(calls) == 1
+
+    paths = spec.to_dict()["paths"]
+    assert paths["/users/{id}"]["get"]["tags"] == ["users"]
+    assert paths["/teams/{id}"]["get"]["tags"] == ["users"]
+    assert paths["/teams/{id}"]["post"]["tags"] == ["/teams"]
+    assert paths["/users/{id}"]["get"]["responses"]["200"]["description"] == "A user"
+
+
+# Test 17: test that freezing the spec serializes it and releases the rest
+def test_freeze_spec():
+    from chalice_spec.chalice import BlueprintWithSpec
+    from chalice_spec.docs import _built_operations
+
+    app, spec = setup_test()
+    blueprint = BlueprintWithSpec(__name__)
+
+    @blueprint.route("/things", docs=Docs(get=AnotherSchema))
+    def things():
+        pass
+
+    app.register_blueprint(blueprint)
+
+    @app.route("/", docs=Docs(get=TestSchema))
+    def index():
+        pass
+
+    document = json.loads(json.dumps(spec.to_dict()))
+    frozen = app.freeze_spec()
+
+    assert isinstance(frozen, bytes)
+    assert app.frozen_spec is frozen
+    assert app.freeze_spec() is frozen
+    assert json.loads(frozen) == document
+    assert b'": ' not in frozen
+
+    assert spec.to_dict()["paths"] == {}
+    assert spec not in _built_operations
+    assert blueprint._chalice_spec_docs is None
+
+    with pytest.raises(TypeError):
+        app.build_spec()
+
+    with pytest.raises(TypeError):
+
+        @app.route("/more", docs=Docs(get=TestSchema))
+        def more():
+            pass
+
+    with pytest.raises(TypeError):
+        app.register_blueprint(BlueprintWithSpec(__name__))
+
+    with pytest.raises(TypeError):
+        setup_test()[0].register_blueprint(blueprint)
+
+    # Routes without docs may still be added.
+    @app.route("/undocumented")
+    def undocumented():
+        pass
+
+
+# Test 18: test querying part of the spec
+def test_query_spec():
+    app, spec = setup_test()
+
+    @app.route("/users", docs=Docs(get=TestSchema))
+    def users():
+        pass
+
+    @app.route("/teams", docs=Docs(get=AnotherSchema))
+    def teams():
+        pass
+
+    index = app.spec_index()
+    assert app.spec_index() is index
+    assert app.query_spec(components=["TestSchema"]) == {
+        "paths": {"/users": spec.to_dict()["paths"]["/users"]},
+        "info": {"title": "Test Schema", "version": "0.0.0"},
+        "openapi": "3.0.1",
+        "components": {
+            "schemas": {
+                "TestSchema": spec.to_dict()["components"]["schemas"]["TestSchema"]
+            }
+        },
+    }
+
+    @app.route("/teams/{id}", docs=Docs(get=AnotherSchema))
+    def team(id):
+        pass
+
+    assert app.spec_index() is not index
+    assert list(app.query_spec(paths=["/teams"])["paths"]) == ["/teams", "/teams/{id}"]
+
+    app.freeze_spec()
+    assert list(app.query_spec(tags=["/users"])["paths"]) == ["/users"]
+
+
+# Test 19: test pruning components that no operation uses
+def test_prune_components():
+    app, spec = setup_test(prune_components=True)
+    spec.components.schema("Unused", {"type": "object"})
+
+    @app.route("/users", docs=Docs(get=TestSchema))
+    def users():
+        pass
+
+    assert set(spec.to_dict()["components"]["schemas"]) == {"TestSchema", "Unused"}
+    assert list(app.spec_document()["components"]["schemas"]) == ["TestSchema"]
+
+    frozen = json.loads(app.freeze_spec())
+    assert list(frozen["components"]["schemas"]) == ["TestSchema"]
+
+
+# Test 20: test replacing structurally identical components with aliases
+def test_deduplicate_components():
+    from pydantic import BaseModel
+
+    class Greeting(BaseModel):
+        hello: str
+        world: int
+
+    class Wrapped(BaseModel):
+        inner: TestSchema
+
+    class WrappedGreeting(BaseModel):
+        inner: Greeting
+
+    app, spec = setup_test(deduplicate_components=True)
+
+    @app.route("/test", docs=Docs(get=Wrapped, post=WrappedGreeting))
+    def test():
+        pass
+
+    schemas = app.spec_document()["components"]["schemas"]
+    assert schemas["Greeting"] == {"$ref": "#/components/schemas/TestSchema"}
+    assert schemas["WrappedGreeting"] == {"$ref": "#/components/schemas/Wrapped"}
+    assert "title" in spec.to_dict()["components"]["schemas"]["Greeting"]
+
+    operations = app.spec_document()["paths"]["/test"]
+    post = operations["post"]["responses"]["200"]["content"]["application/json"]
+    assert post["schema"] == {"$ref": "#/components/schemas/Wrapped"}
+
+
+# Test 21: test default responses and hoisting repeated parameters and responses
+def test_default_responses_and_hoisting():
+    app, spec = setup_test(
+        default_responses=[Resp(AnotherSchema, code=404, description="Not found")],
+        hoist_components=True,
+    )
+
+    @app.route("/users/{id}", docs=Docs(get=TestSchema))
+    def user(id):
+        pass
+
+    @app.route(
+        "/teams/{id}",
+        docs=Docs(
+            get=Op(
+                responses=[
+                    Resp(TestSchema),
+                    Resp(TestSchema, code=404, description="No team"),
+                ]
+            )
+        ),
+    )
+    def team(id):
+        pass
+
+    paths = spec.to_dict()["paths"]
+    assert paths["/users/{id}"]["get"]["responses"]["404"] == {
+        "$ref": "#/components/responses/AnotherSchema404"
+    }
+    assert paths["/teams/{id}"]["get"]["responses"]["404"]["description"] == "No team"
+    assert paths["/users/{id}"]["parameters"][0]["name"] == "id"
+
+    document = app.spec_document()
+    assert document["components"]["parameters"] == {
+        "path.id": paths["/users/{id}"]["parameters"][0]
+    }
+    assert document["components"]["responses"] == {
+        "AnotherSchema404": spec.to_dict()["components"]["responses"][
+            "AnotherSchema404"
+        ],
+        "TestSchema200": paths["/users/{id}"]["get"]["responses"]["200"],
+    }
+    for path in ("/users/{id}", "/teams/{id}"):
+        assert document["paths"][path]["parameters"] == [
+            {"$ref": "#/components/parameters/path.id"}
+        ]
+        assert document["paths"][path]["get"]["responses"]["200"] == {
+            "$ref": "#/components/responses/TestSchema200"
+        }
+    # The spec itself is left alone.
+    assert "parameters" not in spec.to_dict()["components"]
+
+
+# Test 22: test that freezing one app leaves blueprints other apps still use
+def test_freeze_spec_shared_blueprint():
+    from chalice_spec.chalice import BlueprintWithSpec
+
+    blueprint = BlueprintWithSpec(__name__)
+
+    @blueprint.route("/things", docs=Docs(get=AnotherSchema))
+    def things():
+        pass
+
+    app, spec = setup_test()
+    app.register_blueprint(blueprint)
+    lazy_app, lazy_spec = setup_test(lazy_spec=True)
+    lazy_app.register_blueprint(blueprint, url_prefix="/lazy")
+
+    app.freeze_spec()
+    assert blueprint._chalice_spec_docs is not None
+    assert list(lazy_app.build_spec().to_dict()["paths"]) == ["/lazy/things"]
+
+    lazy_app.freeze_spec()
+    assert blueprint._chalice_spec_docs is None
+    with pytest.raises(TypeError):
+        blueprint.spec_fragment(spec, PydanticPlugin())
+
+
+# Test 23: test that freezing the spec drops its models' cached schemas
+def test_freeze_spec_forgets_schemas():
+    from chalice_spec.chalice import BlueprintWithSpec
+
+    cache = SchemaCache()
+    spec = APISpec(
+        title="Test Schema",
+        openapi_version="3.0.1",
+        version="0.0.0",
+        plugins=[PydanticPlugin(cache=cache)],
+    )
+    app = ChaliceWithSpec(app_name="test", spec=spec)
+    blueprint = BlueprintWithSpec(__name__)
+
+    @blueprint.route("/things", docs=Docs(get=AnotherSchema))
+    def things():
+        pass
+
+    @app.route("/", docs=Docs(get=TestSchema))
+    def index():
+        pass
+
+    app.register_blueprint(blueprint)
+    assert cache.info().size == 2
+
+    app.freeze_spec()
+    assert cache.info().size == 0
+
+
+# Test 24: test that docs can be pickled
+def test_pickle_docs():
+    import pickle
+
+    docs = Docs(
+        summary="Users",
+        get=Op(
+            tags=["users"],
+            parameters=[{"in": "query", "name": "q"}],
+            responses=[Resp(TestSchema), Resp(AnotherSchema, code=404)],
+        ),
+        post=TestSchema,
+    )
+
+    copy = pickle.loads(pickle.dumps(docs))
+    assert copy == docs
+    assert hash(copy) == hash(docs)
+    assert copy.get.responses[404]["application/json"].model is AnotherSchema
+
+
+# Test 25: test that apps sharing a plugin record their own stats
+def test_spec_stats_shared_plugin():
+    plugin = PydanticPlugin(cache=SchemaCache())
+    apps = [
+        ChaliceWithSpec(
+            app_name=name,
+            spec=APISpec(
+                title=name, openapi_version="3.0.1", version="0.0.0", plugins=[plugin]
+            ),
+        )
+        for name in ("first", "second")
+    ]
+
+    first, second = apps
+
+    @first.route("/", docs=Docs(get=TestSchema))
+    def first_route():
+        pass
+
+    @second.route("/", docs=Docs(get=AnotherSchema))
+    def second_route():
+        pass
+
+    assert set(first.spec_stats.model_seconds) == {"TestSchema"}
+    assert set(second.spec_stats.model_seconds) == {"AnotherSchema"}
+    assert plugin.stats is None
+
+
+# Test 26: test that blueprint routes are validated like the app's own
+def test_blueprint_request_validation():
+    from chalice import Chalice
+    from chalice.test import Client
+
+    from chalice_spec.chalice import BlueprintWithSpec
+
+    blueprint = BlueprintWithSpec(__name__)
+
+    @blueprint.route(
+        "/validated",
+        methods=["POST"],
+        docs=Docs(post=Op(request=TestSchema, response=AnotherSchema)),
+    )
+    def validated():
+        return {"hello": blueprint.current_request.validated_body.hello}
+
+    @blueprint.route(
+        "/unvalidated",
+        methods=["POST"],
+        docs=Docs(post=Op(request=TestSchema, response=AnotherSchema)),
+        validate_request=False,
+    )
+    def unvalidated():
+        return blueprint.current_request.json_body
+
+    app, spec = setup_test(validate_requests=True)
+    app.register_blueprint(blueprint, url_prefix="/bp")
+
+    with Client(app) as client:
+        headers = {"Content-Type": "application/json"}
+        response = client.http.post(
+            "/bp/validated", headers=headers, body='{"hello": "there", "world": 1}'
+        )
+        assert response.json_body == {"hello": "there"}
+
+        response = client.http.post("/bp/validated", headers=headers, body="{}")
+        assert response.status_code == 400
+
+        response = client.http.post("/bp/unvalidated", headers=headers, body="{}")
+        assert response.status_code == 200
+
+    optional = BlueprintWithSpec(__name__)
+
+    @optional.route("/", methods=["POST"], validate_request=True)
+    def index():
+        pass
+
+    with pytest.raises(TypeError):
+        Chalice(app_name="plain").register_blueprint(optional)
+
+
+# Test 27: test that responses made identical by deduplication are hoisted
+def test_deduplicate_then_hoist():
+    from pydantic import BaseModel
+
+    class Greeting(BaseModel):
+        hello: str
+        world: int
+
+    app, spec = setup_test(deduplicate_components=True, hoist_components=True)
+
+    @app.route("/test", docs=Docs(get=TestSchema))
+    def test():
+        pass
+
+    @app.route("/greeting", docs=Docs(get=Greeting))
+    def greeting():
+        pass
+
+    paths = app.spec_document()["paths"]
+    assert paths["/test"]["get"]["responses"]["200"] == {
+        "$ref": "#/components/responses/TestSchema200"
+    }
+    assert (
+        paths["/greeting"]["get"]["responses"]["200"]
+        == paths["/test"]["get"]["responses"]["200"]
+    )
@@ -0,0 +1,344 @@
+from chalice_spec.documents import (
+    SpecIndex,
+    deduplicate,
+    duplicate_components,
+    fan_in,
+    hoist_components,
+    minify,
+    referenced,
+    ref_pointer,
+    slugs,
+    split_by_tag,
+    subset,
+    tree_shake,
+    unused_components,
+)
+
+
+def schema_ref(name):
+    return {"$ref": f"#/components/schemas/{name}"}
+
+
+def json_response(name):
+    return {
+        "200": {
+            "description": "Success",
+            "content": {"application/json": {"schema": schema_ref(name)}},
+        }
+    }
+
+
+DOCUMENT = {
+    "openapi": "3.0.1",
+    "info": {"title": "Test", "version": "0"},
+    "tags": [{"name": "pets", "description": "Pets"}, {"name": "/users"}],
+    "paths": {
+        "/pets": {
+            "summary": "Pets",
+            "get": {"tags": ["pets"], "responses": json_response("Pet")},
+            "post": {"tags": ["pets", "/users"], "responses": json_response("Owner")},
+        },
+        "/users": {"get": {"tags": ["/users"], "responses": json_response("User")}},
+        "/health": {"get": {"responses": json_response("Health")}},
+    },
+    "components": {
+        "schemas": {
+            "Pet": {"properties": {"owner": schema_ref("Owner")}},
+            "Owner": {"properties": {"address": schema_ref("Address")}},
+            "Address": {"type": "object"},
+            "User": {"type": "object"},
+            "Health": {"type": "object"},
+        },
+        "securitySchemes": {"key": {"type": "apiKey", "in": "header", "name": "X"}},
+    },
+}
+
+
+def test_ref_pointer():
+    assert ref_pointer("#/components/schemas/Pet") == ("components", "schemas", "Pet")
+    assert ref_pointer("#/definitions/a~1b~0c") == ("definitions", "a/b~c")
+    assert ref_pointer("other.json#/definitions/Pet") is None
+
+
+def test_referenced_is_transitive():
+    assert referenced(DOCUMENT, DOCUMENT["paths"]["/pets"]["get"]) == {
+        ("components", "schemas", "Pet"),
+        ("components", "schemas", "Owner"),
+        ("components", "schemas", "Address"),
+    }
+
+
+def test_subset():
+    document = subset(DOCUMENT, {"/users": DOCUMENT["paths"]["/users"]})
+
+    assert list(document["paths"]) == ["/users"]
+    assert document["components"] == {
+        "schemas": {"User": {"type": "object"}},
+        "securitySchemes": DOCUMENT["components"]["securitySchemes"],
+    }
+    # The original document is left alone.
+    assert len(DOCUMENT["components"]["schemas"]) == 5
+
+
+def test_split_by_tag():
+    documents = split_by_tag(DOCUMENT)
+
+    assert list(documents) == ["pets", "/users"]
+
+    pets = documents["pets"]
+    assert pets["tags"] == [{"name": "pets", "description": "Pets"}]
+    assert pets["paths"] == {"/pets": DOCUMENT["paths"]["/pets"]}
+    assert list(pets["components"]["schemas"]) == ["Pet", "Owner", "Address"]
+
+    users = documents["/users"]
+    assert list(users["paths"]["/pets"]) == ["summary", "post"]
+    assert list(users["paths"]) == ["/pets", "/users"]
+    assert list(users["components"]["schemas"]) == ["Owner", "Address", "User"]
+
+
+def test_split_by_tag_openapi_2():
+    document = {
+        "swagger": "2.0",
+        "paths": {"/pets": {"get": {"tags": ["pets"], "parameters": []}}},
+        "definitions": {"Unused": {"type": "object"}},
+    }
+
+    assert split_by_tag(document)["pets"] == {
+        "swagger": "2.0",
+        "paths": {"/pets": {"get": {"tags": ["pets"], "parameters": []}}},
+    }
+
+
+def test_slugs():
+    assert slugs(["/users", "Pets & Owners", "users", "tags", "/"], ["tags"]) == {
+        "/users": "users",
+        "Pets & Owners": "Pets-Owners",
+        "users": "users-2",
+        "tags": "tags-2",
+        "/": "tag",
+    }
+
+
+def test_spec_index_select():
+    index = SpecIndex(DOCUMENT)
+
+    assert index.under("/pets") == ["/pets"]
+    assert index.under("/") == ["/pets", "/users", "/health"]
+    assert index.under("/pe") == []
+
+    assert index.select(paths=["/pets", "/health"]) == [
+        ("/pets", "get"),
+        ("/pets", "post"),
+        ("/health", "get"),
+    ]
+    assert index.select(tags=["/users"]) == [("/pets", "post"), ("/users", "get")]
+    assert index.select(paths=["/pets"], tags=["/users"]) == [("/pets", "post")]
+    assert index.select(components=["Address"]) == [
+        ("/pets", "get"),
+        ("/pets", "post"),
+    ]
+    assert index.select(tags=["missing"]) == []
+
+
+def test_spec_index_query():
+    document = SpecIndex(DOCUMENT).query(components=["Owner"], tags=["/users"])
+
+    assert document["paths"] == {
+        "/pets": {
+            "summary": "Pets",
+            "post": DOCUMENT["paths"]["/pets"]["post"],
+        }
+    }
+    assert list(document["components"]["schemas"]) == ["Owner", "Address"]
+    assert document == subset(DOCUMENT, document["paths"])
+
+
+def test_fan_in_and_tree_shake():
+    document = dict(
+        DOCUMENT,
+        components=dict(
+            DOCUMENT["components"],
+            schemas=dict(
+                DOCUMENT["components"]["schemas"],
+                Orphan={"properties": {"child": schema_ref("OrphanChild")}},
+                OrphanChild={"type": "object"},
+            ),
+        ),
+    )
+
+    assert fan_in(document) == {
+        "#/components/schemas/Pet": 1,
+        "#/components/schemas/Owner": 2,
+        "#/components/schemas/Address": 1,
+        "#/components/schemas/User": 1,
+        "#/components/schemas/Health": 1,
+        "#/components/schemas/Orphan": 0,
+        "#/components/schemas/OrphanChild": 1,
+    }
+    # OrphanChild is referenced, but only by a component nothing needs.
+    assert unused_components(document) == [
+        "#/components/schemas/Orphan",
+        "#/components/schemas/OrphanChild",
+    ]
+    assert tree_shake(document) == DOCUMENT
+    assert unused_components(DOCUMENT) == []
+
+
+def test_deduplicate():
+    document = dict(
+        DOCUMENT,
+        paths=dict(
+            DOCUMENT["paths"],
+            **{"/homes": {"get": {"responses": json_response("Home")}}},
+        ),
+        components={
+            "schemas": dict(
+                DOCUMENT["components"]["schemas"],
+                # Identical to Owner once Location is known to be Address.
+                Home={
+                    "title": "Home",
+                    "properties": {"address": schema_ref("Location")},
+                },
+                Location={"title": "Location", "type": "object"},
+                # Identical apart from a description.
+                Place={"type": "object", "description": "A place"},
+            )
+        },
+    )
+
+    assert duplicate_components(document) == {
+        "#/components/schemas/User": "#/components/schemas/Address",
+        "#/components/schemas/Health": "#/components/schemas/Address",
+        "#/components/schemas/Home": "#/components/schemas/Owner",
+        "#/components/schemas/Location": "#/components/schemas/Address",
+    }
+
+    deduplicated = deduplicate(document)
+    schemas = deduplicated["components"]["schemas"]
+    assert schemas["Home"] == schema_ref("Owner")
+    assert schemas["Location"] == schema_ref("Address")
+    assert schemas["Place"] == document["components"]["schemas"]["Place"]
+    homes = deduplicated["paths"]["/homes"]["get"]["responses"]["200"]
+    assert homes["content"]["application/json"]["schema"] == schema_ref("Owner")
+    # The original document is left alone.
+    assert document["components"]["schemas"]["Home"]["title"] == "Home"
+
+    pruned = tree_shake(deduplicated)["components"]["schemas"]
+    assert list(pruned) == ["Pet", "Owner", "Address"]
+
+    unique = subset(DOCUMENT, {"/pets": DOCUMENT["paths"]["/pets"]})
+    assert deduplicate(unique) is unique
+
+
+def test_hoist_components():
+    id_parameter = {"in": "path", "name": "id", "type": "string", "required": True}
+    other_id = dict(id_parameter, type="integer")
+    not_found = {"description": "Not found"}
+    updated = {"description": "Updated"}
+    document = {
+        "swagger": "2.0",
+        "paths": {
+            "/a/{id}": {
+                "parameters": [id_parameter],
+                "get": {"responses": {"404": not_found}},
+            },
+            "/b/{id}": {
+                "parameters": [id_parameter],
+                "get": {"parameters": [other_id], "responses": {"404": not_found}},
+                "put": {"parameters": [other_id], "responses": {"200": updated}},
+            },
+        },
+        "parameters": {"path.id": {"in": "path", "name": "existing"}},
+    }
+
+    hoisted = hoist_components(document)
+
+    assert hoisted["parameters"] == {
+        "path.id": {"in": "path", "name": "existing"},
+        "path.id_2": id_parameter,
+        "path.id_3": other_id,
+    }
+    # Responses are named after their code where they have no schema.
+    assert hoisted["responses"] == {"Response404": not_found}
+    assert hoisted["paths"]["/b/{id}"] == {
+        "parameters": [{"$ref": "#/parameters/path.id_2"}],
+        "get": {
+            "parameters": [{"$ref": "#/parameters/path.id_3"}],
+            "responses": {"404": {"$ref": "#/responses/Response404"}},
+        },
+        "put": {
+            "parameters": [{"$ref": "#/parameters/path.id_3"}],
+            "responses": {"200": updated},
+        },
+    }
+    # The original document is left alone.
+    assert document["paths"]["/a/{id}"]["parameters"] == [id_parameter]
+    assert hoist_components(document, min_uses=5) is document
+
+
+def test_minify():
+    document = {
+        "openapi": "3.0.1",
+        "info": {"title": "Test", "version": "0", "description": "A test"},
+        "paths": {
+            "/pets": {
+                "summary": "Pets",
+                "get": {
+                    "tags": [],
+                    "security": [],
+                    "responses": {"200": {"description": "Success", "content": {}}},
+                },
+            }
+        },
+        "components": {
+            "schemas": {
+                "Pet": {
+                    "type": "object",
+                    "description": "A pet",
+                    "example": {"description": "Rex"},
+                    "properties": {
+                        "description": {"type": "string", "description": "Bio"},
+                        "tags": {"type": "array", "items": {}},
+                    },
+                    "default": {"description": "keep me", "tags": [], "summary": "x"},
+                    "enum": [{"description": "a"}],
+                    "x-internal": {"description": "b", "tags": []},
+                },
+                "Empty": {"type": "object", "properties": {}, "required": []},
+            }
+        },
+    }
+
+    assert minify(document) == {
+        "openapi": "3.0.1",
+        "info": {"title": "Test", "version": "0"},
+        "paths": {
+            "/pets": {
+                "get": {"security": [], "responses": {"200": {"description": ""}}}
+            }
+        },
+        "components": {
+            "schemas": {
+                "Pet": {
+                    "type": "object",
+                    "properties": {
+                        "description": {"type": "string"},
+                        "tags": {"type": "array", "items": {}},
+                    },
+                    "default": {"description": "keep me", "tags": [], "summary": "x"},
+                    "enum": [{"description": "a"}],
+                    "x-internal": {"description": "b", "tags": []},
+                },
+                "Empty": {"type": "object"},
+            }
+        },
+    }
+    # Only empty values are left out without stripping.
+    compact = minify(document, strip=())
+    assert compact["paths"]["/pets"]["summary"] == "Pets"
+    assert compact["components"]["schemas"]["Empty"] == {"type": "object"}
+    assert compact["components"]["schemas"]["Pet"]["default"] == {
+        "description": "keep me",
+        "tags": [],
+        "summary": "x",
+    }
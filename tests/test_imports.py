@@ -0,0 +1,34 @@
+import statistics
+
+from benchmarks.imports import import_time
+
+
+def third_party(loaded):
+    return {name.split(".")[0] for name in loaded} & {"apispec", "chalice", "pydantic"}
+
+
+def test_package_import_is_lazy():
+    runs = [import_time("chalice_spec") for _ in range(3)]
+
+    assert third_party(runs[0]) == set()
+    # Typically a few milliseconds; the bound only catches eager imports
+    # creeping back in, which cost over a hundred.
+    assert statistics.median(run["chalice_spec"] for run in runs) < 30_000
+
+
+def test_docs_import_is_light():
+    assert third_party(import_time("chalice_spec.docs")) == set()
+
+
+def test_runtime_import_only_needs_chalice():
+    assert third_party(import_time("chalice_spec.runtime")) == {"chalice"}
+
+
+def test_public_names():
+    import chalice_spec
+
+    for name in chalice_spec.__all__:
+        assert getattr(chalice_spec, name) is not None
+    assert chalice_spec.Op is chalice_spec.docs.Operation
+    assert chalice_spec.schema_cache is chalice_spec.pydantic.schema_cache
+    assert "PydanticPlugin" in dir(chalice_spec)
@@ -0,0 +1,134 @@
+import json
+
+import pytest
+from chalice import Chalice
+from chalice.test import Client
+
+from chalice_spec.__main__ import main
+from chalice_spec.blueprint import chalice_spec_blueprint
+
+
+def test_export(tmp_path):
+    out = tmp_path / "openapi.json"
+
+    assert main(["export", "tests.chalicelib.spec_app:app", "--out", str(out)]) == 0
+
+    from tests.chalicelib.spec_app import spec
+
+    assert json.loads(out.read_text()) == spec.to_dict()
+    assert list(spec.to_dict()["paths"]) == ["/"]
+
+
+def test_export_stdout(capsys):
+    assert main(["export", "tests.chalicelib.spec_app:app", "--indent", "2"]) == 0
+
+    output = capsys.readouterr().out
+    assert output.startswith('{\n  "paths"')
+    assert "TestSchema" in json.loads(output)["components"]["schemas"]
+
+
+def test_export_not_an_app():
+    for target in (
+        "tests.chalicelib.spec_app:spec",
+        "tests.chalicelib.spec_app:missing",
+        "tests.chalicelib.missing_app:app",
+        "tests.chalicelib.spec_app",
+    ):
+        with pytest.raises(SystemExit) as e:
+            main(["export", target])
+        assert e.value.code == 1
+
+
+def test_export_broken_app():
+    # Errors in the app itself are raised with their traceback.
+    with pytest.raises(ImportError):
+        main(["export", "tests.chalicelib.broken_app:app"])
+
+
+def test_serve_exported_spec(tmp_path):
+    out = tmp_path / "openapi.json"
+    main(["export", "tests.chalicelib.spec_app:app", "--out", str(out)])
+
+    app = Chalice(app_name="runtime")
+    app.register_blueprint(chalice_spec_blueprint(spec_file=str(out)))
+
+    with Client(app) as client:
+        response = client.http.get("/openapi.json")
+        assert response.body == out.read_bytes()
+        assert response.headers["Content-Type"] == "application/json"
+
+        response = client.http.get(
+            "/openapi.json", headers={"If-None-Match": response.headers["ETag"]}
+        )
+        assert response.status_code == 304
+
+
+def test_serve_exported_spec_at_runtime(tmp_path):
+    from chalice_spec.runtime import SWAGGER_HTML, spec_blueprint
+
+    out = tmp_path / "openapi.json"
+    main(["export", "tests.chalicelib.spec_app:app", "--out", str(out)])
+
+    app = Chalice(app_name="runtime")
+    app.register_blueprint(spec_blueprint(str(out), enable_swagger=True))
+
+    with Client(app) as client:
+        response = client.http.get("/openapi.json")
+        assert response.body == out.read_bytes()
+        assert response.headers["Cache-Control"] == "no-cache"
+
+        response = client.http.get("/docs")
+        assert response.body.decode("utf-8") == SWAGGER_HTML
+        assert response.headers["Content-Type"] == "text/html"
+
+
+def test_blueprint_requires_one_spec():
+    with pytest.raises(TypeError):
+        chalice_spec_blueprint()
+
+
+def test_profile(capsys):
+    assert main(["profile", "tests.chalicelib.spec_app:app"]) == 0
+    output = capsys.readouterr().out
+    assert "Spec build: 1 paths" in output
+    assert "TestSchema" in output
+
+    assert main(["profile", "tests.chalicelib.spec_app:app", "--json"]) == 0
+    stats = json.loads(capsys.readouterr().out)
+    assert list(stats["route_seconds"]) == ["/"]
+    assert "import_seconds" in stats
+
+
+def test_components(capsys):
+    assert main(["components", "tests.chalicelib.spec_app:app"]) == 0
+    output = capsys.readouterr().out
+    assert "Components: 1, unused: 0" in output
+    assert "1  #/components/schemas/TestSchema" in output
+
+    assert main(["components", "tests.chalicelib.spec_app:app", "--json"]) == 0
+    assert json.loads(capsys.readouterr().out) == {
+        "fan_in": {"#/components/schemas/TestSchema": 1},
+        "unused": [],
+        "unused_bytes": 0,
+        "duplicates": {},
+        "duplicate_bytes": 0,
+    }
+
+
+def test_frozen_app(tmp_path, capsys):
+    out = tmp_path / "openapi.json"
+
+    assert main(["export", "tests.chalicelib.frozen_app:app", "--out", str(out)]) == 0
+
+    from tests.chalicelib.frozen_app import app
+
+    assert out.read_bytes() == app.frozen_spec
+
+    assert main(["profile", "tests.chalicelib.frozen_app:app"]) == 0
+    output = capsys.readouterr().out
+    assert "spec frozen during import" in output
+    assert "AnotherSchema" in output
+
+    assert main(["components", "tests.chalicelib.frozen_app:app", "--json"]) == 0
+    report = json.loads(capsys.readouterr().out)
+    assert report["fan_in"] == {"#/components/schemas/AnotherSchema": 1}
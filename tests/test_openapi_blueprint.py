@@ -0,0 +1,447 @@
+import gzip
+import json
+
+from apispec import APISpec
+from chalice import Blueprint, Chalice
+from chalice.test import Client
+
+from chalice_spec import Docs, PydanticPlugin
+from chalice_spec.blueprint import (
+    COMPRESSED_CONTENT_TYPE,
+    SerializedSpec,
+    add_spec_routes,
+    chalice_spec_blueprint,
+    negotiate_encoding,
+    serialize_spec,
+)
+from chalice_spec.chalice import ChaliceWithSpec
+import chalice_spec.runtime
+from chalice_spec.runtime import StaticSpec
+from tests.schema import TestSchema, AnotherSchema
+
+
+def setup_test(**kwargs):
+    spec = APISpec(
+        title="Test Schema",
+        openapi_version="3.0.1",
+        version="0.0.0",
+        plugins=[PydanticPlugin()],
+    )
+    app = ChaliceWithSpec(app_name="test", spec=spec, **kwargs)
+    return app, spec
+
+
+def test_openapi_json():
+    app, spec = setup_test()
+    app.register_blueprint(chalice_spec_blueprint(spec))
+
+    @app.route("/", docs=Docs(get=TestSchema))
+    def test():
+        pass
+
+    with Client(app) as client:
+        response = client.http.get("/openapi.json")
+
+    assert response.status_code == 200
+    assert response.headers["Content-Type"] == "application/json"
+    assert json.loads(response.body) == spec.to_dict()
+
+
+def test_openapi_json_lazy():
+    app, spec = setup_test(lazy_spec=True)
+    app.register_blueprint(chalice_spec_blueprint(app))
+
+    @app.route("/", docs=Docs(get=TestSchema))
+    def test():
+        pass
+
+    assert spec.to_dict()["paths"] == {}
+
+    with Client(app) as client:
+        response = client.http.get("/openapi.json")
+
+    assert list(json.loads(response.body)["paths"]) == ["/"]
+
+
+def test_openapi_json_lazy_spec():
+    app, spec = setup_test(lazy_spec=True)
+    app.register_blueprint(chalice_spec_blueprint(spec))
+
+    @app.route("/", docs=Docs(get=TestSchema))
+    def test():
+        pass
+
+    with Client(app) as client:
+        response = client.http.get("/openapi.json")
+        assert list(json.loads(response.body)["paths"]) == ["/"]
+
+        @app.route("/other", docs=Docs(get=AnotherSchema))
+        def other():
+            pass
+
+        response = client.http.get("/openapi.json")
+        assert list(json.loads(response.body)["paths"]) == ["/", "/other"]
+
+
+def test_serialized_spec_is_cached():
+    app, spec = setup_test()
+
+    @app.route("/", docs=Docs(get=TestSchema))
+    def test():
+        pass
+
+    serialized = SerializedSpec(spec)
+    body = serialized.body
+    assert serialized.body is body
+
+    @app.route("/another", docs=Docs(get=AnotherSchema))
+    def another():
+        pass
+
+    assert serialized.body is not body
+    assert list(json.loads(serialized.body)["paths"]) == ["/", "/another"]
+    assert "AnotherSchema" in json.loads(serialized.body)["components"]["schemas"]
+
+
+def test_openapi_json_conditional():
+    app, spec = setup_test()
+    app.register_blueprint(chalice_spec_blueprint(spec, enable_swagger=True))
+
+    @app.route("/", docs=Docs(get=TestSchema))
+    def test():
+        pass
+
+    with Client(app) as client:
+        response = client.http.get("/openapi.json")
+        etag = response.headers["ETag"]
+        assert response.headers["Cache-Control"] == "no-cache"
+
+        response = client.http.get("/openapi.json", headers={"If-None-Match": etag})
+        assert response.status_code == 304
+        assert response.body == b""
+        assert response.headers["ETag"] == etag
+
+        response = client.http.get(
+            "/openapi.json", headers={"If-None-Match": '"stale", W/' + etag}
+        )
+        assert response.status_code == 304
+
+        @app.route("/another", docs=Docs(get=AnotherSchema))
+        def another():
+            pass
+
+        response = client.http.get("/openapi.json", headers={"If-None-Match": etag})
+        assert response.status_code == 200
+        assert response.headers["ETag"] != etag
+
+        response = client.http.get("/docs")
+        assert response.status_code == 200
+        assert response.headers["Content-Type"] == "text/html"
+        response = client.http.get(
+            "/docs", headers={"If-None-Match": response.headers["ETag"]}
+        )
+        assert response.status_code == 304
+
+
+def test_cache_control():
+    app, spec = setup_test()
+    app.register_blueprint(chalice_spec_blueprint(spec, cache_control="max-age=60"))
+
+    with Client(app) as client:
+        response = client.http.get("/openapi.json")
+    assert response.headers["Cache-Control"] == "max-age=60"
+
+    app, spec = setup_test()
+    app.register_blueprint(chalice_spec_blueprint(spec, cache_control=None))
+
+    with Client(app) as client:
+        response = client.http.get("/openapi.json")
+    assert "Cache-Control" not in response.headers
+
+
+def test_openapi_json_compressed():
+    app, spec = setup_test()
+    app.register_blueprint(chalice_spec_blueprint(spec, compress=True))
+
+    @app.route("/", docs=Docs(get=TestSchema))
+    def test():
+        pass
+
+    with Client(app) as client:
+        response = client.http.get(
+            "/openapi.json",
+            headers={"Accept": "*/*", "Accept-Encoding": "gzip, deflate"},
+        )
+        assert response.headers["Content-Encoding"] == "gzip"
+        assert response.headers["Content-Type"] == COMPRESSED_CONTENT_TYPE
+        assert response.headers["Vary"] == "Accept, Accept-Encoding"
+        assert json.loads(gzip.decompress(response.body)) == spec.to_dict()
+
+        response = client.http.get(
+            "/openapi.json",
+            headers={
+                "Accept": "*/*",
+                "Accept-Encoding": "gzip",
+                "If-None-Match": response.headers["ETag"],
+            },
+        )
+        assert response.status_code == 304
+
+        response = client.http.get("/openapi.json", headers={"Accept": "*/*"})
+        assert "Content-Encoding" not in response.headers
+        assert response.headers["Vary"] == "Accept, Accept-Encoding"
+        assert json.loads(response.body) == spec.to_dict()
+
+
+def test_openapi_json_frozen():
+    app, spec = setup_test()
+    app.register_blueprint(chalice_spec_blueprint(app, compress=True))
+
+    @app.route("/", docs=Docs(get=TestSchema))
+    def test():
+        pass
+
+    with Client(app) as client:
+        etag = client.http.get("/openapi.json").headers["ETag"]
+        document = json.loads(json.dumps(spec.to_dict()))
+        frozen = app.freeze_spec()
+
+        response = client.http.get("/openapi.json")
+        assert response.body == frozen
+        assert json.loads(response.body) == document
+        assert response.headers["ETag"] == etag
+
+        response = client.http.get(
+            "/openapi.json",
+            headers={"Accept": "*/*", "Accept-Encoding": "gzip"},
+        )
+        assert gzip.decompress(response.body) == frozen
+
+
+def test_openapi_json_split_by_tag():
+    app, spec = setup_test()
+    app.register_blueprint(
+        chalice_spec_blueprint(app, enable_swagger=True, split_tags=True)
+    )
+
+    @app.route("/users", docs=Docs(get=TestSchema))
+    def users():
+        pass
+
+    @app.route("/teams", docs=Docs(get=AnotherSchema))
+    def teams():
+        pass
+
+    with Client(app) as client:
+        response = client.http.get("/openapi/tags.json")
+        assert json.loads(response.body) == [
+            {"name": "/users", "url": "users.json"},
+            {"name": "/teams", "url": "teams.json"},
+        ]
+
+        response = client.http.get("/openapi/users.json")
+        document = json.loads(response.body)
+        assert list(document["paths"]) == ["/users"]
+        assert list(document["components"]["schemas"]) == ["TestSchema"]
+        etag = response.headers["ETag"]
+
+        response = client.http.get(
+            "/openapi/users.json", headers={"If-None-Match": etag}
+        )
+        assert response.status_code == 304
+
+        assert client.http.get("/openapi/missing.json").status_code == 404
+        assert client.http.get("/openapi/users").status_code == 404
+
+        response = client.http.get("/docs")
+        assert b"./openapi/tags.json" in response.body
+
+        # Tags are split again once the spec changes.
+        @app.route("/users/{id}", docs=Docs(get=AnotherSchema))
+        def user(id):
+            pass
+
+        response = client.http.get("/openapi/users.json")
+        document = json.loads(response.body)
+        assert list(document["paths"]) == ["/users", "/users/{id}"]
+        assert response.headers["ETag"] != etag
+
+
+def test_openapi_json_query():
+    app, spec = setup_test()
+    app.register_blueprint(chalice_spec_blueprint(app))
+
+    @app.route("/users", docs=Docs(get=TestSchema))
+    def users():
+        pass
+
+    @app.route("/users/{id}/teams", docs=Docs(get=AnotherSchema))
+    def user_teams(id):
+        pass
+
+    @app.route("/teams", docs=Docs(get=AnotherSchema))
+    def teams():
+        pass
+
+    with Client(app) as client:
+        response = client.http.get("/openapi.json?paths=/users")
+        document = json.loads(response.body)
+        assert list(document["paths"]) == ["/users", "/users/{id}/teams"]
+
+        response = client.http.get(
+            "/openapi.json?paths=/users&components=AnotherSchema"
+        )
+        document = json.loads(response.body)
+        assert list(document["paths"]) == ["/users/{id}/teams"]
+        assert list(document["components"]["schemas"]) == ["AnotherSchema"]
+
+        response = client.http.get("/openapi.json?tags=/teams,/users")
+        assert len(json.loads(response.body)["paths"]) == 3
+        etag = response.headers["ETag"]
+
+        response = client.http.get(
+            "/openapi.json?tags=/teams,/users", headers={"If-None-Match": etag}
+        )
+        assert response.status_code == 304
+
+        response = client.http.get("/openapi.json?tags=missing")
+        assert json.loads(response.body)["paths"] == {}
+        assert "components" not in json.loads(response.body)
+
+        response = client.http.get("/openapi.json")
+        assert json.loads(response.body) == spec.to_dict()
+
+
+def test_openapi_json_compressed_without_accept():
+    app, spec = setup_test()
+    app.register_blueprint(chalice_spec_blueprint(spec, compress=True))
+
+    @app.route("/", docs=Docs(get=TestSchema))
+    def test():
+        return {"hello": "world"}
+
+    assert "application/json" not in app.api.binary_types
+
+    with Client(app) as client:
+        for headers in [{}, {"Accept": "text/html"}, {"Accept-Encoding": "gzip"}]:
+            response = client.http.get("/openapi.json", headers=headers)
+            assert response.status_code == 200
+            assert response.headers["Content-Type"] == "application/json"
+            assert "Content-Encoding" not in response.headers
+            assert json.loads(response.body) == spec.to_dict()
+
+        # Other JSON routes are left alone.
+        assert client.http.get("/").status_code == 200
+
+
+def test_openapi_json_compression_requires_binary_types():
+    spec = APISpec(title="Test", openapi_version="3.0.1", version="0")
+    blueprint = Blueprint(__name__)
+    add_spec_routes(blueprint, StaticSpec(serialize_spec(spec)), compress=True)
+    app = Chalice(app_name="test")
+    app.register_blueprint(blueprint)
+
+    with Client(app) as client:
+        response = client.http.get(
+            "/openapi.json", headers={"Accept": "*/*", "Accept-Encoding": "gzip"}
+        )
+    assert response.status_code == 200
+    assert "Content-Encoding" not in response.headers
+    assert json.loads(response.body) == spec.to_dict()
+
+
+def test_negotiate_encoding():
+    assert negotiate_encoding(None, ["gzip"]) is None
+    assert negotiate_encoding("gzip", ["gzip"]) == "gzip"
+    assert negotiate_encoding("deflate", ["gzip"]) is None
+    assert negotiate_encoding("*", ["br", "gzip"]) == "br"
+    assert negotiate_encoding("gzip, br;q=0.5", ["br", "gzip"]) == "gzip"
+    assert negotiate_encoding("gzip;q=0", ["gzip"]) is None
+    assert negotiate_encoding("gzip;q=0.5, identity", ["gzip"]) is None
+
+
+def test_openapi_json_profiles():
+    app, spec = setup_test()
+    app.register_blueprint(chalice_spec_blueprint(app, profile="minified"))
+
+    @app.route("/users", docs=Docs(summary="Users", get=TestSchema))
+    def users():
+        """List the users."""
+        pass
+
+    with Client(app) as client:
+        response = client.http.get("/openapi.json")
+        operation = json.loads(response.body)["paths"]["/users"]["get"]
+        assert "summary" not in operation
+        assert operation["responses"]["200"]["description"] == ""
+        minified_etag = response.headers["ETag"]
+
+        response = client.http.get("/openapi.json?profile=full")
+        operation = json.loads(response.body)["paths"]["/users"]["get"]
+        assert operation["summary"] == "List the users."
+        assert response.headers["ETag"] != minified_etag
+
+        response = client.http.get("/openapi.json?profile=compact&paths=/users")
+        operation = json.loads(response.body)["paths"]["/users"]["get"]
+        assert operation["summary"] == "List the users."
+
+        response = client.http.get("/openapi.json?profile=tiny")
+        assert response.status_code == 400
+
+
+def test_openapi_json_does_not_copy_spec_per_request(monkeypatch):
+    app, spec = setup_test()
+    app.register_blueprint(chalice_spec_blueprint(app))
+
+    @app.route("/", docs=Docs(get=TestSchema))
+    def test():
+        pass
+
+    with Client(app) as client:
+        client.http.get("/openapi.json")
+
+        to_dict = spec.to_dict
+        calls = []
+        monkeypatch.setattr(spec, "to_dict", lambda: calls.append(1) or to_dict())
+        for _ in range(3):
+            assert client.http.get("/openapi.json").status_code == 200
+        assert calls == []
+
+        @app.route("/other", docs=Docs(get=AnotherSchema))
+        def other():
+            pass
+
+        assert "/other" in json.loads(client.http.get("/openapi.json").body)["paths"]
+        assert len(calls) == 1
+
+        spec.tag({"name": "later"})
+        document = json.loads(client.http.get("/openapi.json").body)
+        assert document["tags"] == [{"name": "later"}]
+
+        spec.options["servers"] = [{"url": "https://example.com"}]
+        document = json.loads(client.http.get("/openapi.json").body)
+        assert document["servers"] == [{"url": "https://example.com"}]
+        assert len(calls) == 3
+
+
+def test_spec_queries_are_least_recently_used(monkeypatch):
+    monkeypatch.setattr(chalice_spec.runtime, "MAX_QUERIES", 2)
+    app, spec = setup_test()
+
+    @app.route("/users", docs=Docs(get=TestSchema))
+    def users():
+        pass
+
+    @app.route("/teams", docs=Docs(get=AnotherSchema))
+    def teams():
+        pass
+
+    served = StaticSpec(serialize_spec(spec))
+    users_query = served.query(paths=["/users"])
+    teams_query = served.query(paths=["/teams"])
+    assert served.query(paths=["/users"]) is users_query
+
+    # The oldest query has just been used, so the other one is evicted.
+    served.query(tags=["/users"])
+    assert served.query(paths=["/users"]) is users_query
+    assert served.query(paths=["/teams"]) is not teams_query
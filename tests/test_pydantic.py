@@ -1,7 +1,17 @@
+import pytest
 from apispec import APISpec
+from pydantic import BaseModel, ValidationError
 
-from chalice_spec.pydantic import PydanticPlugin
-from tests.schema import TestSchema, NestedSchema
+import tests.schema
+
+from chalice_spec.pydantic import (
+    PYDANTIC_V2,
+    PydanticPlugin,
+    SchemaCache,
+    model_fingerprint,
+    model_validator,
+)
+from tests.schema import TestSchema, NestedSchema, DeeplyNestedSchema
 
 
 def test_pydantic():
@@ -78,3 +88,226 @@ def test_deeply_nested_schemas():
             }
         },
     }
+
+
+def test_schema_cache():
+    cache = SchemaCache()
+
+    def build_spec():
+        spec = APISpec(
+            title="Test Schema",
+            openapi_version="3.0.1",
+            version="0.0.0",
+            plugins=[PydanticPlugin(cache=cache)],
+        )
+        spec.components.schema("NestedSchema", model=NestedSchema, spec=spec)
+        spec.components.schema("TestSchema", model=TestSchema)
+        return spec
+
+    first = build_spec()
+    assert cache.info() == (0, 2, 2, 0)
+
+    second = build_spec()
+    assert cache.info() == (2, 2, 2, 0)
+    assert first.to_dict() == second.to_dict()
+    assert set(second.to_dict()["components"]["schemas"]) == {
+        "NestedSchema",
+        "DeeplyNestedSchema",
+        "MoreDeeplyNestedSchema",
+        "TestSchema",
+    }
+
+    # Specs must not share the cached schema objects.
+    first.to_dict()["components"]["schemas"]["TestSchema"]["title"] = "Changed"
+    assert second.to_dict()["components"]["schemas"]["TestSchema"]["title"] == (
+        "TestSchema"
+    )
+
+    cache.clear()
+    assert cache.info() == (0, 0, 0, 0)
+
+
+def test_disk_schema_cache(tmp_path):
+    def build_spec(cache):
+        spec = APISpec(
+            title="Test Schema",
+            openapi_version="3.0.1",
+            version="0.0.0",
+            plugins=[PydanticPlugin(cache=cache)],
+        )
+        spec.components.schema("NestedSchema", model=NestedSchema, spec=spec)
+        return spec
+
+    cold = SchemaCache(directory=str(tmp_path))
+    first = build_spec(cold)
+    assert cold.info() == (0, 1, 1, 0)
+    assert [p.name for p in tmp_path.iterdir()] == [
+        model_fingerprint(NestedSchema) + ".json"
+    ]
+
+    # A new process (here, a new cache) reads the schema back from disk.
+    warm = SchemaCache(directory=str(tmp_path))
+    second = build_spec(warm)
+    assert warm.info() == (0, 0, 1, 1)
+    assert first.to_dict() == second.to_dict()
+
+    # Corrupt entries are regenerated.
+    (tmp_path / (model_fingerprint(NestedSchema) + ".json")).write_text("{")
+    corrupt = SchemaCache(directory=str(tmp_path))
+    assert build_spec(corrupt).to_dict() == first.to_dict()
+    assert corrupt.info() == (0, 1, 1, 0)
+
+
+def test_model_fingerprint():
+    class First(BaseModel):
+        hello: str
+
+    class Second(BaseModel):
+        hello: int
+
+    assert model_fingerprint(First) == model_fingerprint(First)
+    assert model_fingerprint(First) != model_fingerprint(Second)
+    assert model_fingerprint(NestedSchema) != model_fingerprint(TestSchema)
+
+
+def test_model_fingerprint_includes_base_classes(monkeypatch):
+    from chalice_spec import pydantic as chalice_spec_pydantic
+
+    class Base(BaseModel):
+        __module__ = "other_models"
+        hello: str
+
+    class Child(Base):
+        world: int
+
+    fingerprint = model_fingerprint(Child)
+    # A change to the base class's module, such as a field's description.
+    monkeypatch.setitem(chalice_spec_pydantic._source_hashes, "other_models", "new")
+    assert model_fingerprint(Child) != fingerprint
+
+
+def test_register_models():
+    def build_spec(batch):
+        cache = SchemaCache()
+        spec = APISpec(
+            title="Test Schema",
+            openapi_version="3.0.1",
+            version="0.0.0",
+            plugins=[PydanticPlugin(cache=cache)],
+        )
+        models = [NestedSchema, DeeplyNestedSchema, TestSchema, NestedSchema]
+        if batch:
+            spec.plugins[0].register_models(spec, models)
+        else:
+            for model in models:
+                if model.__name__ not in spec.components.schemas:
+                    spec.components.schema(model.__name__, model=model, spec=spec)
+        return spec, cache
+
+    batched, cache = build_spec(batch=True)
+    individual, _ = build_spec(batch=False)
+
+    assert batched.to_dict() == individual.to_dict()
+    assert cache.info() == (0, 3, 3, 0)
+
+    # The schemas generated in a batch match those generated one by one.
+    assert cache.get(NestedSchema) == SchemaCache().get(NestedSchema)
+    assert cache.get(DeeplyNestedSchema) == SchemaCache().get(DeeplyNestedSchema)
+
+
+def test_register_models_with_clashing_names():
+    class TestSchema(BaseModel):
+        other: str
+
+    class Wrapper(BaseModel):
+        test: TestSchema
+
+    spec = APISpec(
+        title="Test Schema",
+        openapi_version="3.0.1",
+        version="0.0.0",
+        plugins=[PydanticPlugin(cache=SchemaCache())],
+    )
+    spec.plugins[0].register_models(
+        spec, [Wrapper, NestedSchema, tests.schema.TestSchema]
+    )
+
+    assert spec.to_dict()["components"]["schemas"]["Wrapper"]["properties"] == {
+        "test": {"$ref": "#/components/schemas/TestSchema"}
+    }
+    assert spec.to_dict()["components"]["schemas"]["TestSchema"]["required"] == [
+        "other"
+    ]
+
+
+def test_model_validator():
+    validate = model_validator(TestSchema)
+
+    assert validate({"hello": "there", "world": 1}) == TestSchema(
+        hello="there", world=1
+    )
+    with pytest.raises(ValidationError):
+        validate({"hello": "there"})
+
+
+@pytest.mark.skipif(not PYDANTIC_V2, reason="TypeAdapters are new in Pydantic 2")
+def test_type_adapters_are_shared():
+    from chalice_spec.pydantic import type_adapter
+
+    adapter = type_adapter(TestSchema)
+    assert type_adapter(TestSchema) is adapter
+    assert model_validator(TestSchema).__self__ is adapter
+
+
+@pytest.mark.skipif(not PYDANTIC_V2, reason="TypeAdapters are new in Pydantic 2")
+def test_type_adapters_do_not_keep_models_alive(monkeypatch):
+    import gc
+    import weakref
+
+    from pydantic import create_model
+
+    import chalice_spec.pydantic
+    from chalice_spec.pydantic import type_adapter
+
+    # The batched schemas are generated from the cached adapters.
+    adapted = []
+    monkeypatch.setattr(
+        chalice_spec.pydantic,
+        "type_adapter",
+        lambda model: adapted.append(model) or type_adapter(model),
+    )
+    Temporary = create_model("Temporary", value=(int, ...))
+    Subclass = create_model("Subclass", __base__=Temporary)
+    cache = SchemaCache()
+    cache.get_many([Temporary, Subclass])
+    assert adapted == [Temporary, Subclass]
+    assert type_adapter(Subclass) is not type_adapter(Temporary)
+    model_validator(Temporary)({"value": 1})
+
+    reference = weakref.ref(Temporary)
+    del Temporary, Subclass, adapted
+    gc.collect()
+    assert reference() is None
+
+
+def test_model_fingerprint_includes_fields():
+    from pydantic import Field, create_model
+
+    # Models created at runtime share the module of create_model.
+    fingerprints = {
+        model_fingerprint(create_model("Thing", **fields))
+        for fields in (
+            {"name": (str, ...)},
+            {"title": (str, ...)},
+            {"name": (str, Field(..., description="The name"))},
+            {"name": (str, Field(..., alias="Name"))},
+            {"name": (str, "default")},
+            {"name": (str, Field(..., max_length=10))},
+        )
+    }
+    assert len(fingerprints) == 6
+
+    def thing():
+        return create_model("Thing", names=(list, Field(default_factory=list)))
+
+    assert model_fingerprint(thing()) == model_fingerprint(thing())
@@ -0,0 +1,102 @@
+import logging
+
+from chalice import Response
+from chalice.test import Client
+
+from chalice_spec.chalice import BlueprintWithSpec
+from chalice_spec.validation import ResponseCheck, response_violations
+from chalice_spec.docs import Docs, Op, Resp
+from chalice_spec.pydantic import model_validator
+from tests.schema import TestSchema, AnotherSchema
+from tests.test_chalice import setup_test
+
+
+def test_response_violations():
+    check = ResponseCheck(
+        rate=1.0,
+        validators={
+            200: {"application/json": model_validator(TestSchema)},
+            404: {"application/json": model_validator(AnotherSchema)},
+        },
+    )
+
+    assert response_violations(check, {"hello": "there", "world": 1}) == []
+    assert (
+        response_violations(
+            check,
+            Response(body='{"nintendo": "mario", "atari": "pong"}', status_code=404),
+        )
+        == []
+    )
+
+    assert response_violations(check, Response(body="", status_code=500)) == [
+        "status code 500 is not documented"
+    ]
+    assert response_violations(
+        check, Response(body="hi", headers={"Content-Type": "text/plain"})
+    ) == ["content type text/plain is not documented for status 200"]
+    assert response_violations(check, Response(body="{")) == [
+        "body of status 200 is not valid JSON"
+    ]
+    (violation,) = response_violations(check, {"hello": "there"})
+    assert violation.startswith("body of status 200 does not match its model")
+
+
+def test_sampled_response_validation(caplog):
+    app, spec = setup_test(response_validation_rate=1.0)
+
+    @app.route(
+        "/",
+        methods=["GET", "POST"],
+        docs=Docs(
+            get=TestSchema,
+            post=Op(
+                request=AnotherSchema,
+                responses=[Resp(model=TestSchema, code=201)],
+                response_validation_rate=0.0,
+            ),
+        ),
+    )
+    def index():
+        return {"hello": "there"}
+
+    with caplog.at_level(logging.WARNING), Client(app) as client:
+        assert client.http.get("/").json_body == {"hello": "there"}
+        assert client.http.post("/").json_body == {"hello": "there"}
+
+    warnings = [record.getMessage() for record in caplog.records]
+    assert len(warnings) == 1
+    assert warnings[0].startswith("Response to GET / violates the spec: body of")
+
+
+def test_unsampled_responses_are_not_validated(caplog):
+    app, spec = setup_test()
+
+    @app.route("/", docs=Docs(get=TestSchema))
+    def index():
+        return {"hello": "there"}
+
+    with caplog.at_level(logging.WARNING), Client(app) as client:
+        assert client.http.get("/").json_body == {"hello": "there"}
+
+    assert caplog.records == []
+
+
+def test_sampled_blueprint_response_validation(caplog):
+    blueprint = BlueprintWithSpec(
+        __name__, default_responses=[Resp(model=AnotherSchema, code=404)]
+    )
+
+    @blueprint.route("/", docs=Docs(get=TestSchema))
+    def index():
+        return Response(body={"wrong": True}, status_code=404)
+
+    app, spec = setup_test(response_validation_rate=1.0)
+    app.register_blueprint(blueprint)
+
+    with caplog.at_level(logging.WARNING), Client(app) as client:
+        assert client.http.get("/").status_code == 404
+
+    warnings = [record.getMessage() for record in caplog.records]
+    assert len(warnings) == 1
+    assert "body of status 404 does not match its model" in warnings[0]